@@ -0,0 +1,206 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark suite for grammar compilation, parsing, output extraction, tokenization and reinflection.
+
+Run from the repository root:
+
+    python -m benchmarks.run -o results.json
+    python -m benchmarks.run --compare results.json
+
+Each benchmark is repeated and the minimum, median and mean wall-clock times are saved as JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable
+
+import suomilog
+import suomilog.grammar
+from suomilog.synthetic import SyntheticGrammarSpec, generate_grammar, generate_tokens
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+NP_GRAMMAR = os.path.join(ROOT, "examples", "np_parser", "np.suomilog")
+EMPLOYEES_GRAMMAR = os.path.join(ROOT, "examples", "employees", "employees.suomilog")
+TEST_CASES = os.path.join(ROOT, "examples", "np_parser", "test_cases.tsv")
+
+
+def measure(function: Callable[[], object], repeat: int) -> dict[str, float]:
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		function()
+		times.append(time.perf_counter() - start)
+
+	return {"min": min(times), "median": statistics.median(times), "mean": statistics.mean(times), "repeat": repeat}
+
+
+def read_test_phrases() -> list[str]:
+	with open(TEST_CASES) as file:
+		return [line.split("\t")[0] for line in file if line.strip()]
+
+
+def employee_tokens(length: int) -> list[suomilog.Token]:
+	"""
+	Tokens for the employees grammar, e.g. "suuri suuri ... yhtiö joka työllistää suomalaisen".
+	"""
+	tokens = [suomilog.Token("suuri", [("suuri", {"nimento"})]) for _ in range(max(length - 4, 0))]
+	tokens.append(suomilog.Token("yhtiö", [("yhtiö", {"nimento"})]))
+	tokens.append(suomilog.Token("joka", []))
+	tokens.append(suomilog.Token("työllistää", []))
+	tokens.append(suomilog.Token("suomalaisen", [("suomalainen", {"omanto"})]))
+	return tokens[-length:]
+
+
+def run_benchmarks(repeat: int, selected: str | None) -> dict[str, dict[str, float]]:
+	results: dict[str, dict[str, float]] = {}
+
+	def bench(name: str, function: Callable[[], object], repeat: int = repeat):
+		if selected and selected not in name:
+			return
+
+		results[name] = measure(function, repeat)
+		print(f"{name:<40} {results[name]['median']*1000:>10.3f} ms", file=sys.stderr)
+
+	# Kieliopin kääntäminen
+
+	def load_employees():
+		suomilog.grammar._file_cache.clear()
+		return suomilog.Grammar().load(EMPLOYEES_GRAMMAR)
+
+	bench("load/employees", load_employees)
+	employees_grammar = load_employees()
+	bench("compile/employees", lambda: suomilog.CYKParser(employees_grammar, "PATTERN"))
+	employees_parser = suomilog.CYKParser(employees_grammar, "PATTERN")
+
+	for size in (10, 50, 200):
+		grammar = generate_grammar(SyntheticGrammarSpec(nonterminals=size, features=2, feature_values=3))
+		bench(f"compile/synthetic-{size}", lambda: suomilog.CYKParser(grammar, "ROOT"), repeat=max(1, repeat // 2))
+
+	# Jäsentäminen
+
+	for length in (4, 8, 16, 32):
+		tokens = employee_tokens(length)
+		bench(f"parse/employees/len-{length}", lambda: employees_parser.parse(tokens))
+		bench(f"output/employees/len-{length}", lambda: employees_parser.parse(tokens).get_output(".PATTERN{}"))
+
+	# Synteettisillä kieliopeilla mitataan, miten jäsennysaika kasvaa syötteen pituuden ja moniselitteisyyden mukana
+
+	for ambiguity in (0.0, 0.3):
+		grammar = generate_grammar(SyntheticGrammarSpec(nonterminals=30, ambiguity=ambiguity, features=2, feature_values=3, nullable_density=0.1))
+		synthetic_parser = suomilog.CYKParser(grammar, "ROOT")
+		for length in (8, 16, 32):
+			tokens = generate_tokens(grammar, length, seed=length)
+			bench(f"parse/synthetic-{ambiguity}/len-{length}", lambda: synthetic_parser.parse(tokens))
+			bench(f"output/synthetic-{ambiguity}/len-{length}", lambda: synthetic_parser.parse(tokens, budget=suomilog.ParseBudget(max_outputs_per_cell=10_000, truncate_outputs=True)).get_output(".ROOT{}"))
+
+	# Suomen kielen työkalut ja NP-jäsennin vaativat pypykon
+
+	try:
+		import suomilog.finnish as fiutils
+		from examples.np_parser import parser as np_parser
+
+	except ModuleNotFoundError as e:
+		print(f"Skipping Finnish benchmarks: {e}", file=sys.stderr)
+		return results
+
+	phrases = read_test_phrases()
+
+	def load_np():
+		suomilog.grammar._file_cache.clear()
+		np_parser.get_parser.cache_clear()
+		return np_parser.get_parser()
+
+	bench("compile/np", load_np, repeat=max(1, repeat // 2))
+	parser = load_np()
+
+	bench("tokenize/test-phrases", lambda: [fiutils.tokenize(phrase) for phrase in phrases])
+
+	tokenized = [fiutils.tokenize(phrase) for phrase in phrases]
+	for length in (1, 2, 4, 8):
+		# Lyhyistä fraaseista kootaan pidempiä rinnastuksia, jotka ovat moniselitteisiä
+		tokens = [token for tokens in tokenized[:length] for token in tokens + fiutils.tokenize(",")][:-1]
+		bench(f"parse/np/phrases-{length}", lambda: parser.parse(tokens))
+		bench(f"output/np/phrases-{length}", lambda: parser.parse(tokens).get_output(".ROOT{}"))
+
+	def inflect_kissa():
+		return [fiutils.inflect_nominal("kissa", number, case) for number in ("+sg", "+pl") for case in fiutils.SINGULAR_AND_PLURAL_CASES]
+
+	def reinflect_phrases():
+		return [np_parser.reinflect(phrase, "+pl", "+ess") for phrase in phrases]
+
+	def cold(function: Callable[[], object]) -> Callable[[], object]:
+		# Taivutusvälimuisti tyhjennetään jokaisella toistolla, jotta mitataan itse taivuttamista
+		def run():
+			fiutils.clear_inflection_cache()
+			return function()
+
+		return run
+
+	bench("inflect_nominal/kissa", cold(inflect_kissa))
+	bench("inflect_nominal/kissa/warm", inflect_kissa)
+	bench("reinflect/test-phrases", cold(reinflect_phrases), repeat=max(1, repeat // 2))
+	bench("reinflect/test-phrases/warm", reinflect_phrases, repeat=max(1, repeat // 2))
+
+	return results
+
+
+def compare(old: dict, new: dict):
+	print(f"{'benchmark':<40} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+	for name, result in new["results"].items():
+		if name not in old["results"]:
+			continue
+
+		old_median = old["results"][name]["median"]
+		ratio = result["median"] / old_median if old_median else float("inf")
+		print(f"{name:<40} {old_median*1000:>10.3f} {result['median']*1000:>10.3f} {ratio:>7.2f}")
+
+
+def main():
+	argparser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	argparser.add_argument("-o", "--output", help="save the results to this JSON file")
+	argparser.add_argument("-r", "--repeat", type=int, default=10)
+	argparser.add_argument("-k", "--select", help="run only benchmarks whose name contains this string")
+	argparser.add_argument("--compare", help="compare the results to an earlier JSON file")
+	args = argparser.parse_args()
+
+	results = {
+		"metadata": {
+			"python": platform.python_version(),
+			"implementation": platform.python_implementation(),
+			"platform": platform.platform(),
+			"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		},
+		"results": run_benchmarks(args.repeat, args.select),
+	}
+
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump(results, file, indent=2)
+
+	if args.compare:
+		with open(args.compare) as file:
+			compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+	main()
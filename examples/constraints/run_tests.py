@@ -0,0 +1,95 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checks the bracketing constraints of `CYKParser.parse` and `MappedCYKParser.parse`.
+
+Run from the repository root:
+
+    python -m examples.constraints.run_tests
+
+The constraints are defined on the rules of the grammar, so a flat rule of three words must not be split into the binarized parts.
+pypykko is not needed.
+"""
+
+import os
+import sys
+import tempfile
+
+import suomilog
+from suomilog import grammar
+
+GRAMMAR = "\n".join([
+	".R ::= a b c -> abc",
+	".R ::= a .N -> a($1)",
+	".R ::= .M c -> m($1)",
+	".N ::= b c -> bc",
+	".M ::= a b -> ab",
+])
+
+# (säännöt, jänne, odotetut tulosteet ilman leikkausta, odotetut tulosteet pakollisella rakenteella)
+CASES = [
+	(".R ::= a b c -> abc", (1, 3), {"abc"}, set()),
+	(".R ::= a b c -> abc", (0, 2), {"abc"}, set()),
+	(".R ::= a b c -> abc", (0, 3), {"abc"}, {"abc"}),
+	(".R ::= a b c -> abc", (1, 2), {"abc"}, {"abc"}),
+	(GRAMMAR, (1, 3), {"abc", "a(bc)"}, {"a(bc)"}),
+	(GRAMMAR, (0, 2), {"abc", "m(ab)"}, {"m(ab)"}),
+	(GRAMMAR, (0, 3), {"abc", "a(bc)", "m(ab)"}, {"abc", "a(bc)", "m(ab)"}),
+]
+
+
+def word(text: str) -> suomilog.Token:
+	return suomilog.Token(text, [(text, set())])
+
+
+def check(name: str, parser: suomilog.CYKParser[str] | suomilog.MappedCYKParser[str], span: tuple[int, int], expected_brackets: set[str], expected_constituents: set[str]) -> bool:
+	tokens = [word("a"), word("b"), word("c")]
+	brackets = parser.parse(tokens, constraints=[span]).get_output(".R{}") or frozenset()
+	constituents = parser.parse(tokens, constituents=[span]).get_output(".R{}") or frozenset()
+	ok = True
+	if brackets != expected_brackets:
+		print(f"{name} {span}: constraints gave {sorted(brackets)}, expected {sorted(expected_brackets)}")
+		ok = False
+
+	if constituents != expected_constituents:
+		print(f"{name} {span}: constituents gave {sorted(constituents)}, expected {sorted(expected_constituents)}")
+		ok = False
+
+	return ok
+
+
+def main():
+	ok = True
+	for i, (rules, span, expected_brackets, expected_constituents) in enumerate(CASES):
+		g: grammar.Grammar[str] = grammar.Grammar()
+		g.loads(rules)
+		parser = suomilog.CYKParser(g, "R")
+		ok &= check(f"case {i}", parser, span, expected_brackets, expected_constituents)
+
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, "grammar.cg")
+			suomilog.write_compiled_grammar(parser, path)
+			mapped = suomilog.MappedCYKParser(path)
+			ok &= check(f"case {i} (mapped)", mapped, span, expected_brackets, expected_constituents)
+			mapped.close()
+
+	print("ok" if ok else "VIRHE")
+	sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+	main()
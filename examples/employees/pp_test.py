@@ -28,10 +28,7 @@ query = ProductionRule("QUERY", [
 ], StringOutput("search($1)"))
 
 path = os.path.dirname(os.path.realpath(__file__))
-with open(os.path.join(path, "employees.suomilog")) as file:
-	for line in file:
-		if "::=" in line:
-			grammar.parse_grammar_line(line.replace("\n", ""))
+grammar.load(os.path.join(path, "employees.suomilog"))
 
 n_patterns = sum([len(category) for category in grammar.patterns.values()])
 print("Ladattu", n_patterns, "fraasia.")
@@ -16,7 +16,8 @@
 
 import argparse
 import os
-from typing import AbstractSet, Literal, NamedTuple, Sequence
+from concurrent.futures import Executor
+from typing import AbstractSet, Iterable, Literal, NamedTuple, Sequence
 import itertools
 import functools
 
@@ -38,7 +39,7 @@ class OutputT(NamedTuple):
 	weight: float
 
 
-class ReinflectorOutput(suomilog.Output[OutputT]):
+class ReinflectorOutput(suomilog.TemplateOutput[OutputT]):
 	def __init__(self, output: str):
 		# Jäsentää ulostulokoodin ("->" jälkeen tulevan koodin kieliopissa)
 		if "::" in output:
@@ -50,10 +51,13 @@ class ReinflectorOutput(suomilog.Output[OutputT]):
 		else:
 			self.weight = 0.0
 
+		super().__init__(output)
+
+	def compile(self, code: str) -> list[suomilog.TemplateOp]:
 		words: list[tuple[str, Annotation]] = [("", "normal")]
 		noinfl_depth = 0
 		nonlemma_infl_depth = 0
-		for char in output:
+		for char in code:
 			if char == "(":
 				noinfl_depth += 1
 			
@@ -82,42 +86,32 @@ class ReinflectorOutput(suomilog.Output[OutputT]):
 				else:
 					words = words[:-1] + [(words[-1][0] + char, state)]
 		
-		self.annotations = words
+		return [self.compile_word(word, state) for word, state in words]
 
 	def eval(self, args: Sequence[OutputT]) -> OutputT:
-		argsmap: dict[str, OutputT] = {f"${i+1}": arg for i, arg in enumerate(args)}
 		tokens: list[AnnotatedToken] = []
 		weight = self.weight
-		for variable, state in self.annotations:
-			if "{" in variable and variable.endswith("}"):
-				i = variable.index("{")
-				bits = frozenset(variable[i+1:-1].split(","))
-				variable = variable[:i]
-
-			else:
-				bits = frozenset({"$"})
-
-			if not variable.startswith("$"):
+		for op in self.ops:
+			if op.literal is not None:
 				# tämä ei olekaan muuttuja vaan tokeni
-				tokens.append(AnnotatedToken(variable, bits, state))
+				tokens.append(AnnotatedToken(op.literal, op.bits, op.annotation))  # type: ignore
 				continue
 
-			assert variable in argsmap, f"Variable {variable} does not exist (variables={argsmap})"
+			assert op.arg < len(args), f"Variable ${op.arg+1} does not exist (variables={args})"
+			arg = args[op.arg]
 
 			# Muuttujaa taivutetaan normaalisti, eli samalla tavalla kuin sisemmät säännöt taivuttavat sitä
-			if state == "normal":
-				for token in argsmap[variable].tokens:
-					tokens.append(AnnotatedToken(token.token, suomilog.merge_bits(bits, token.bits), token.annotation))
-
-				weight += argsmap[variable].weight
+			if op.annotation == "normal":
+				for token in arg.tokens:
+					tokens.append(AnnotatedToken(token.token, suomilog.merge_bits(op.bits, token.bits), token.annotation))
 			
 			# Muussa tapauksessa ylikirjoitetaan sisemmän säännön taivutussääntö tämän säännön taivutussäännöllä (paitsi jos sana ei taivu)
 			else:
-				for token in argsmap[variable].tokens:
-					new_annotation = "noinfl" if token.annotation == "noinfl" else state
-					tokens.append(AnnotatedToken(token.token, suomilog.merge_bits(bits, token.bits), new_annotation))
-				
-				weight += argsmap[variable].weight
+				for token in arg.tokens:
+					new_annotation = "noinfl" if token.annotation == "noinfl" else op.annotation
+					tokens.append(AnnotatedToken(token.token, suomilog.merge_bits(op.bits, token.bits), new_annotation))  # type: ignore
+
+			weight += arg.weight
 		
 		return OutputT(tuple(tokens), weight)
 
@@ -157,17 +151,21 @@ def get_parser():
 	]
 
 	path = os.path.dirname(os.path.realpath(__file__))
-	with open(os.path.join(path, "np.suomilog")) as file:
-		for line in file:
-			if "::=" in line and not line.startswith("#"):
-				grammar.parse_grammar_line(line.replace("\n", ""), default_output=ReinflectorOutput)
-
-			elif line.startswith("$"):
-				grammar.parse_variable_line(line.strip())
+	grammar.load(os.path.join(path, "np.suomilog"), default_output=ReinflectorOutput)
 
 	return suomilog.CYKParser(grammar, "ROOT")
 
 def reinflect(term: str, plural_tag: str, case_tag: str, poss: str = "") -> list[str]:
+	return reinflect_paradigm(term, [(plural_tag, case_tag, poss)])[plural_tag, case_tag, poss]
+
+def reinflect_paradigm(term: str, tags: Iterable[fiutils.ParadigmTag] | None = None, executor: Executor | None = None) -> dict[fiutils.ParadigmTag, list[str]]:
+	"""
+	Parses the term once and reinflects it to all given (number, case, possessive) forms,
+	by default to the full paradigm returned by `fiutils.paradigm_tags`.
+	If an executor is given, the forms are generated in it in parallel.
+	"""
+	tags = list(tags) if tags is not None else fiutils.paradigm_tags()
+
 	parser = get_parser()
 
 	tokens = fiutils.tokenize(term)
@@ -176,11 +174,17 @@ def reinflect(term: str, plural_tag: str, case_tag: str, poss: str = "") -> list
 
 	outputs = analysis.get_output(".ROOT{}")
 	if not outputs:
-		return []
+		return {tag: [] for tag in tags}
+
+	inflect = functools.partial(reinflect_outputs, sorted(outputs, key=lambda o: o.weight))
+	results = executor.map(inflect, tags) if executor else map(inflect, tags)
+	return dict(zip(tags, results))
 
+def reinflect_outputs(outputs: Sequence[OutputT], tag: fiutils.ParadigmTag) -> list[str]:
+	plural_tag, case_tag, poss = tag
 	result = []
 
-	for output in sorted(outputs, key=lambda o: o.weight):
+	for output in outputs:
 		inflected: list[list[str]] = []
 		for token in output.tokens:
 			inflected.append(reinflect_token(token, plural_tag, case_tag, poss))
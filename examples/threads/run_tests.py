@@ -0,0 +1,150 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checks that one compiled parser can be shared by many threads.
+
+Run from the repository root:
+
+    python -m examples.threads.run_tests
+
+Each grammar is parsed serially and in a thread pool with the same parser, and the outputs and derivation counts must be equal.
+The compiled tables of the parser must not change. pypykko is not needed.
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import AbstractSet, Callable, Sequence
+
+import suomilog
+from suomilog import grammar
+from suomilog.synthetic import SyntheticGrammarSpec, generate_grammar, generate_tokens
+
+THREADS = 8
+
+
+class NumberRule(grammar.BaseRule[str]):
+	"""
+	A custom rule that matches one token consisting of digits.
+	"""
+
+	def __repr__(self):
+		return "NumberRule()"
+
+	def to_code(self) -> str:
+		return "<number>"
+
+	def match(self, grammar: grammar.Grammar[str], tokens: Sequence[grammar.Token], bits: AbstractSet[str]) -> list[str]:
+		return [f"num({tokens[0].surfaceform})"] if len(tokens) == 1 and tokens[0].surfaceform.isdigit() else []
+
+	def expand_bits(self, name: str, grammar: grammar.Grammar[str], bits: AbstractSet[str], extended=None) -> "NumberRule":
+		return self
+
+
+def word(text: str) -> suomilog.Token:
+	return suomilog.Token(text, [(text, set())])
+
+
+def custom_rule_grammar() -> tuple[grammar.Grammar[str], list[list[suomilog.Token]]]:
+	g: grammar.Grammar[str] = grammar.Grammar()
+	g.loads("\n".join([
+		".ROOT ::= .A -> $1",
+		".ROOT ::= .A ja .ROOT -> $1 & $2",
+		".A ::= .X kpl -> $1",
+		".A ::= .X .X kpl -> $1$2",
+	]))
+	g.rules["X"] = [NumberRule()]
+	inputs = []
+	for n in range(1, 12):
+		tokens: list[suomilog.Token] = []
+		for i in range(n):
+			tokens += [word(str(10 + i)), word("kpl"), word("ja")]
+
+		inputs.append(tokens[:-1])
+
+	return g, inputs
+
+
+def synthetic_grammar() -> tuple[grammar.Grammar[str], list[list[suomilog.Token]]]:
+	g = generate_grammar(SyntheticGrammarSpec(nonterminals=30, ambiguity=0.3, features=2, feature_values=3, nullable_density=0.1))
+	return g, [generate_tokens(g, length, seed=length) for length in range(2, 20)]
+
+
+def table_snapshot(parser: suomilog.CYKParser) -> bytes:
+	tables = [parser.one_rules, parser.one_rules_expanded, parser.two_rules, parser.two_rules_zero_left, parser.two_rules_zero_right]
+	return pickle.dumps(([sorted((repr(k), sorted(v)) for k, v in table.items()) for table in tables], sorted(map(repr, parser.outputs.items()))))
+
+
+def check(name: str, parser: suomilog.CYKParser[str] | suomilog.MappedCYKParser[str], inputs: list[list[suomilog.Token]], snapshot: Callable[[], bytes]) -> bool:
+	def run(tokens: list[suomilog.Token]):
+		budget = suomilog.ParseBudget(max_outputs_per_cell=10_000, truncate_outputs=True)
+		analysis = parser.parse(tokens, budget=budget)
+		return analysis.get_output(".ROOT{}"), analysis.count_derivations(".ROOT{}")
+
+	before = snapshot()
+	serial = [run(tokens) for tokens in inputs]
+	with ThreadPoolExecutor(THREADS) as executor:
+		concurrent = list(executor.map(run, inputs * THREADS))
+
+		# Myös yhden jäsennyksen solut voidaan täyttää rinnakkain
+		if isinstance(parser, suomilog.CYKParser):
+			chart_parallel = [parser.parse(tokens, executor=executor, parallel_threshold=0).get_output(".ROOT{}") for tokens in inputs]
+
+		else:
+			chart_parallel = [outputs for outputs, _ in serial]
+
+	ok = True
+	if not any(outputs for outputs, _ in serial):
+		print(f"{name}: no input was parsed")
+		ok = False
+
+	if concurrent != serial * THREADS:
+		print(f"{name}: concurrent parses differ from serial parses")
+		ok = False
+
+	if chart_parallel != [outputs for outputs, _ in serial]:
+		print(f"{name}: parallel chart filling differs from serial parsing")
+		ok = False
+
+	if snapshot() != before:
+		print(f"{name}: the compiled tables changed during parsing")
+		ok = False
+
+	print(f"{name}: {'ok' if ok else 'VIRHE'}")
+	return ok
+
+
+def main():
+	ok = True
+	for name, (g, inputs) in [("custom rules", custom_rule_grammar()), ("synthetic", synthetic_grammar())]:
+		parser = suomilog.CYKParser(g, "ROOT")
+		ok &= check(name, parser, inputs, lambda: table_snapshot(parser))
+
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, "grammar.cg")
+			suomilog.write_compiled_grammar(parser, path)
+			mapped = suomilog.MappedCYKParser(path)
+			ok &= check(f"{name} (mapped)", mapped, inputs, lambda: b"")
+			mapped.close()
+
+	sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+	main()
@@ -28,7 +28,26 @@ from .grammar import Nonterminal as Nonterminal
 
 from .grammar import Output as Output
 from .grammar import StringOutput as StringOutput
+from .grammar import TemplateOutput as TemplateOutput
+from .grammar import TemplateOp as TemplateOp
 
 from .cykparser import CYKParser as CYKParser
 from .cykparser import CYKAnalysis as CYKAnalysis
+from .cykparser import ParseBudget as ParseBudget
+from .cykparser import ParseStats as ParseStats
+from .cykparser import ParseAborted as ParseAborted
+from .cykparser import ParseCancelled as ParseCancelled
+from .cykparser import BudgetExceeded as BudgetExceeded
 
+from .forest import ParseForest as ParseForest
+from .forest import ParseTree as ParseTree
+
+from .mappedparser import MappedCYKParser as MappedCYKParser
+from .mappedparser import write_compiled_grammar as write_compiled_grammar
+
+from .pipeline import ParsePipeline as ParsePipeline
+from .pipeline import PipelineResult as PipelineResult
+
+from .aio import AsyncParser as AsyncParser
+
+from .profiler import GrammarProfiler as GrammarProfiler
@@ -0,0 +1,113 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from . import grammar
+from .cykparser import CYKParser, ParseBudget
+
+
+type Tokenizer = Callable[[str], list[grammar.Token]]
+
+
+class AsyncParser[OutputT]:
+	"""
+	An asyncio façade for parsing and inflection.
+
+	The work is run in a thread pool owned by this object, so it does not block the event loop.
+	At most `max_pending` calls are running or queued in the pool at a time; further calls wait for a free slot.
+
+	If a call times out or the awaiting task is cancelled, the parse is stopped at the next chart cell
+	(or at the next rule in `get_output`) with the cancellation event given to `CYKParser.parse`.
+	If `budget` is given, it is applied to every parse.
+	"""
+
+	def __init__(self, parser: CYKParser[OutputT], tokenizer: Tokenizer | None = None, max_workers: int | None = None, max_pending: int = 64, timeout: float | None = None, budget: ParseBudget | None = None):
+		if tokenizer is None:
+			from .finnish import tokenize
+			tokenizer = tokenize
+
+		self.parser = parser
+		self.tokenizer = tokenizer
+		self.timeout = timeout
+		self.budget = budget
+		self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="suomilog")
+		self._semaphore = asyncio.Semaphore(max_pending)
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *exc):
+		self.close()
+
+	def close(self):
+		"""
+		Shuts down the thread pool without waiting. Queued calls are cancelled, but parses that are already running are not waited for.
+		"""
+		self._executor.shutdown(wait=False, cancel_futures=True)
+
+	async def aparse(self, text: str | list[grammar.Token], rule_name: str = ".ROOT{}", timeout: float | None = None) -> frozenset[OutputT] | None:
+		"""
+		Tokenizes (if `text` is a string) and parses the text, and returns the outputs of `rule_name`.
+		"""
+		return await self._submit(self._parse, text, rule_name, timeout=timeout)
+
+	async def atokenize(self, text: str, timeout: float | None = None) -> list[grammar.Token]:
+		return await self._submit(lambda cancel: self.tokenizer(text), timeout=timeout)
+
+	async def ainflect_nominal(self, word: str, plural_tag: str, case_tag: str, poss_tag: str = "", timeout: float | None = None) -> list[str]:
+		"""
+		Runs `finnish.inflect_nominal` in the thread pool.
+		"""
+		from .finnish import inflect_nominal
+		return await self._submit(lambda cancel: inflect_nominal(word, plural_tag, case_tag, poss_tag), timeout=timeout)
+
+	def _release(self, loop: asyncio.AbstractEventLoop):
+		# Jäsennys voi päättyä vasta kun tapahtumasilmukka on jo suljettu, eikä paikkaa silloin enää tarvita
+		try:
+			loop.call_soon_threadsafe(self._semaphore.release)
+
+		except RuntimeError:
+			if not loop.is_closed():
+				raise
+
+	def _parse(self, cancel: threading.Event, text: str | list[grammar.Token], rule_name: str) -> frozenset[OutputT] | None:
+		tokens = self.tokenizer(text) if isinstance(text, str) else text
+		return self.parser.parse(tokens, cancel, self.budget).get_output(rule_name)
+
+	async def _submit(self, function, *args, timeout: float | None):
+		loop = asyncio.get_running_loop()
+		await self._semaphore.acquire()
+		cancel = threading.Event()
+		try:
+			future = self._executor.submit(function, cancel, *args)
+
+		except BaseException:
+			self._semaphore.release()
+			raise
+
+		# Paikka vapautetaan vasta kun säie on oikeasti lopettanut, jotta peruutetut jäsennykset eivät kasaannu pooliin
+		future.add_done_callback(lambda _: self._release(loop))
+		try:
+			async with asyncio.timeout(timeout if timeout is not None else self.timeout):
+				return await asyncio.wrap_future(future)
+
+		except BaseException:
+			cancel.set()
+			future.cancel()
+			raise
@@ -14,9 +14,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import itertools
+import threading
+import time
 from collections import defaultdict
-from typing import Hashable, NamedTuple, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, AbstractSet, Callable, Hashable, Iterable, Iterator, Sequence
 from . import grammar
+from .optimizer import OptimizationReport, optimize_grammar
+
+if TYPE_CHECKING:
+	from .forest import ParseForest
 
 
 type CYKTable = defaultdict[tuple[int, int], set[str]]
@@ -25,19 +34,187 @@ type TokenOutputTable[OutputT] = defaultdict[tuple[int, int, str], set[OutputT]]
 type NormalizedOutput[OutputT] = grammar.Output[OutputT] | "DenormalizeStartOutput[OutputT]" | "DenormalizeChainOutput[OutputT]" | "DenormalizeEndOutput[OutputT]"
 
 
+class ParseAborted(Exception):
+	"""
+	Base class of the exceptions that stop parsing or output extraction before it is complete.
+	"""
+
+
+class ParseCancelled(ParseAborted):
+	"""
+	Raised by `CYKParser.parse` and `CYKAnalysis.get_output` when their cancellation event is set.
+	"""
+
+
+class BudgetExceeded(ParseAborted):
+	"""
+	Raised by `CYKParser.parse` and `CYKAnalysis.get_output` when a limit of their `ParseBudget` is exceeded.
+	"""
+	def __init__(self, limit_name: str, limit: float):
+		super().__init__(f"Parse budget exceeded: {limit_name} = {limit}")
+		self.limit_name = limit_name
+		self.limit = limit
+
+
+@dataclass(frozen=True)
+class ParseBudget:
+	"""
+	Limits for one parse. A limit that is None is not checked.
+	"""
+
+	max_tokens: int | None = None
+	"""
+	Longer inputs are rejected before parsing.
+	"""
+
+	max_chart_items: int | None = None
+	"""
+	The maximum total number of symbols in all cells of the chart.
+	"""
+
+	max_outputs_per_cell: int | None = None
+	"""
+	The maximum number of outputs `get_output` may compute for one symbol and span.
+	"""
+
+	truncate_outputs: bool = False
+	"""
+	If true, output sets larger than `max_outputs_per_cell` are truncated to an arbitrary subset instead of raising `BudgetExceeded`.
+	`get_output` then returns a partial result.
+	"""
+
+	time_limit: float | None = None
+	"""
+	Wall-clock seconds for parsing and all `get_output` calls of the resulting analysis, measured from the start of the parse.
+	"""
+
+
+class _ParseGuard:
+	"""
+	Checks the cancellation event and the budget of one parse.
+	"""
+	def __init__(self, cancel: threading.Event | None, budget: ParseBudget | None):
+		self.cancel = cancel
+		self.budget = budget or ParseBudget()
+		self.deadline = time.monotonic() + self.budget.time_limit if self.budget.time_limit is not None else None
+		self.chart_items = 0
+
+	def check(self):
+		if self.cancel is not None and self.cancel.is_set():
+			raise ParseCancelled()
+
+		if self.deadline is not None and time.monotonic() > self.deadline:
+			raise BudgetExceeded("time_limit", self.budget.time_limit)  # type: ignore
+
+	def check_tokens(self, tokens: Sequence[grammar.Token]):
+		if self.budget.max_tokens is not None and len(tokens) > self.budget.max_tokens:
+			raise BudgetExceeded("max_tokens", self.budget.max_tokens)
+
+	def add_chart_items(self, n: int):
+		self.chart_items += n
+		if self.budget.max_chart_items is not None and self.chart_items > self.budget.max_chart_items:
+			raise BudgetExceeded("max_chart_items", self.budget.max_chart_items)
+
+	def limit_outputs[T](self, outputs: set[T]) -> set[T]:
+		limit = self.budget.max_outputs_per_cell
+		if limit is None or len(outputs) <= limit:
+			return outputs
+
+		if not self.budget.truncate_outputs:
+			raise BudgetExceeded("max_outputs_per_cell", limit)
+
+		return set(itertools.islice(outputs, limit))
+
+
+@dataclass
+class ParseStats:
+	"""
+	Counters and phase timings of one parse and the output extraction of its analysis.
+
+	Pass an instance to `CYKParser.parse` or set `CYKParser.stats_callback` to collect them.
+	When neither is done, no statistics are collected.
+	"""
+
+	tokens: int = 0
+	lexical_matches: int = 0
+	"""
+	The number of (token, terminal or custom rule) matches in the lexical phase.
+	"""
+
+	chart_items_per_span: dict[int, int] = field(default_factory=dict)
+	"""
+	The total number of symbols in the chart cells of each span length.
+	"""
+
+	binary_rule_probes: int = 0
+	"""
+	The number of (left symbol, right symbol) pairs looked up in the binary rule table.
+	"""
+
+	custom_rule_calls: int = 0
+	output_evaluations: int = 0
+	"""
+	The number of `Output.eval` calls and denormalization steps in `get_output`.
+	"""
+
+	memo_hits: int = 0
+	lexical_time: float = 0.0
+	chart_time: float = 0.0
+	output_time: float = 0.0
+
+	@property
+	def chart_items(self) -> int:
+		return sum(self.chart_items_per_span.values())
+
+	def as_dict(self) -> dict[str, object]:
+		return {**asdict(self), "chart_items": self.chart_items}
+
+
 class CYKParser[OutputT]:
 	token_rules: dict[str, grammar.Terminal]
 	custom_rules: dict[str, grammar.BaseRule[OutputT]]
 	zero_rules: set[str]
-	one_rules: defaultdict[str, set[str]]
-	one_rules_expanded: defaultdict[str, set[str]]
-	two_rules: defaultdict[tuple[str, str], set[str]]
-	two_rules_zero_left: defaultdict[str, set[tuple[str, str]]]
-	two_rules_zero_right: defaultdict[str, set[tuple[str, str]]]
-	outputs: defaultdict[tuple[str, str | tuple[str, str]], list[NormalizedOutput[OutputT]]]
+	one_rules: dict[str, set[str]]
+	one_rules_expanded: dict[str, set[str]]
+	two_rules: dict[tuple[str, str], set[str]]
+	two_rules_zero_left: dict[str, set[tuple[str, str]]]
+	two_rules_zero_right: dict[str, set[tuple[str, str]]]
+	outputs: dict[tuple[str, str | tuple[str, str]], list[NormalizedOutput[OutputT]]]
 	zero_outputs: dict[str, frozenset[OutputT]]
 
-	def __init__(self, grammar: grammar.Grammar[OutputT], root_nonterminal_name: str):
+	output_origins: dict[tuple[str, str | tuple[str, str]], list[grammar.ProductionRule[OutputT]]]
+	"""
+	For each list in `outputs`, the original grammar rules the outputs were compiled from, in the same order.
+	"""
+
+	root_names: list[str]
+	"""
+	The expanded names of the root nonterminals (e.g. `.ROOT{}`), which can be given to `CYKAnalysis.get_output`.
+	"""
+
+	optimization_report: OptimizationReport | None = None
+	"""
+	What the grammar optimizer removed, if the parser was created with `optimize=True`.
+	"""
+
+	stats_callback: Callable[[ParseStats], None] | None = None
+	"""
+	If set, every parse collects `ParseStats` and this is called with them after the parse and after each `get_output` call of the analysis.
+	"""
+
+	def __init__(self, grammar: grammar.Grammar[OutputT], root_nonterminal_name: str | Iterable[str] | None, optimize: bool = False):
+		"""
+		Compiles the grammar for parsing `root_nonterminal_name`.
+
+		The root can also be a collection of nonterminal names, or None for all nonterminals of the grammar.
+		The roots share the compiled tables, and the chart of one parse contains all of them, so `get_output` can extract any of them.
+
+		If `optimize` is true, contradictory, unproductive and unreachable rules are removed and trivial unary rules are folded
+		before compiling (see `optimizer.optimize_grammar`). The outputs of the roots do not change,
+		but `get_output` can then only be used for the nonterminals that remain.
+
+		The compiled tables are not modified after this, so one parser can be shared by many threads (see `parse`).
+		"""
 		self.token_rules = {}
 		self.custom_rules = {}
 		self.zero_rules = set()
@@ -48,11 +225,37 @@ class CYKParser[OutputT]:
 		self.two_rules_zero_right = defaultdict(set)
 		self.outputs = defaultdict(list)
 		self.zero_outputs = {}
+		self.output_origins = defaultdict(list)
 		self.grammar = grammar
-		self._to_CNF(root_nonterminal_name)
+		self._to_CNF(root_nonterminal_name, optimize)
+
+		# Valmiit taulut muutetaan tavallisiksi sanakirjoiksi, jotta hakuja ei voi vahingossa tehdä lisäämällä avaimia
+		self.one_rules = dict(self.one_rules)
+		self.one_rules_expanded = {
+			symbol: self.one_rules_expanded.get(symbol, set())
+			for symbol in [*self.one_rules_expanded, *self.token_rules, *self.custom_rules, *self.zero_rules]
+		}
+		self.two_rules = dict(self.two_rules)
+		self.two_rules_zero_left = dict(self.two_rules_zero_left)
+		self.two_rules_zero_right = dict(self.two_rules_zero_right)
+		self.outputs = dict(self.outputs)
+		self.output_origins = dict(self.output_origins)
+
+	def _to_CNF(self, root_nonterminal_name: str | Iterable[str] | None, optimize: bool = False):
+		if root_nonterminal_name is None:
+			root_nonterminal_names = list(self.grammar.rules)
+
+		elif isinstance(root_nonterminal_name, str):
+			root_nonterminal_names = [root_nonterminal_name]
+
+		else:
+			root_nonterminal_names = list(root_nonterminal_name)
+
+		expanded_grammar: dict[str, list[grammar.BaseRule[OutputT]]] = {}
+		self.root_names = [self.grammar.expand_bits(name, set(), expanded_grammar)[0] for name in root_nonterminal_names]
+		if optimize:
+			expanded_grammar, self.optimization_report = optimize_grammar(expanded_grammar, self.root_names)
 
-	def _to_CNF(self, root_nonterminal_name: str):
-		_, expanded_grammar = self.grammar.expand_bits(root_nonterminal_name, set())
 		for nonterminal_name in expanded_grammar:
 			for rule in expanded_grammar[nonterminal_name]:
 				# ProductionRule-luokka on niille säännöille, jotka voi jäsentää CYK-algoritmilla.
@@ -76,6 +279,7 @@ class CYKParser[OutputT]:
 					if len(new_words) == 1:
 						self.one_rules[new_words[0]].add(nonterminal_name)
 						self.outputs[(nonterminal_name, new_words[0])].append(rule.output)
+						self.output_origins[(nonterminal_name, new_words[0])].append(rule.origin)
 					
 					else:
 						prev = nonterminal_name
@@ -85,11 +289,13 @@ class CYKParser[OutputT]:
 							pair = (new_words[i], next)
 							self.two_rules[pair].add(prev)
 							self.outputs[(prev, pair)].append(DenormalizeChainOutput(is_nonterminal[i]) if i != 0 else DenormalizeEndOutput(is_nonterminal[i], rule.output))
+							self.output_origins[(prev, pair)].append(rule.origin)
 							prev = next
 						
 						pair = (new_words[-2], new_words[-1])
 						self.two_rules[pair].add(prev)
 						self.outputs[(prev, pair)].append(DenormalizeStartOutput(is_nonterminal[-2], is_nonterminal[-1]) if len(new_words) > 2 else rule.output)
+						self.output_origins[(prev, pair)].append(rule.origin)
 
 				else:
 					self.custom_rules[nonterminal_name] = rule
@@ -129,40 +335,199 @@ class CYKParser[OutputT]:
 							self.two_rules_zero_right[rule].add((rule_name, zero_rule))
 							queue.append(rule)
 	
-	def parse(self, tokens: list[grammar.Token]) -> "CYKAnalysis[OutputT]":
+	def parse(self, tokens: list[grammar.Token], cancel: threading.Event | None = None, budget: ParseBudget | None = None, stats: ParseStats | None = None, max_span: int | None = None, constraints: Iterable[tuple[int, int]] | None = None, constituents: Iterable[tuple[int, int]] | None = None, executor: ThreadPoolExecutor | None = None, parallel_threshold: int = 64) -> "CYKAnalysis[OutputT]":
+		"""
+		Fills the CYK chart for the tokens.
+
+		If `cancel` is given, it is checked before each chart cell and in `CYKAnalysis.get_output`.
+		Setting it from another thread makes the parsing stop with `ParseCancelled`.
+
+		If `budget` is given, parsing and output extraction stop with `BudgetExceeded` when one of its limits is exceeded.
+
+		If `stats` is given, the counters of this parse and of the `get_output` calls of the analysis are added to it.
+
+		If `max_span` is given, only spans of at most that many tokens are parsed, so the cost grows linearly with the length of the input.
+		Use it with `CYKAnalysis.find_spans` to find phrases in long texts.
+
+		`constraints` is a list of bracketing spans `(start, end)`, such as quoted segments (see `finnish.quote_constraints`).
+		No nonterminal of a parse may cross a bracket, i.e. cover some but not all of its tokens and tokens outside it.
+		A bracket does not need to be a constituent itself: a rule can still match it together with the tokens around it.
+		`constituents` is a list of spans that must be constituents: each parse must have a nonterminal that covers exactly the span.
+		Chart cells that cannot be part of such a parse are not filled. Spans shorter than two tokens have no effect.
+		With nullable symbols, parses in which the constituent and empty symbols after it end a rule of three or more symbols are missed.
+
+		If `executor` is given and the input has at least `parallel_threshold` tokens, the cells of each span length are filled in parallel in it.
+		It must be a thread pool, because the workers read the shared chart; the cells are merged into it in this thread.
+		Threads make this faster only on free-threaded Python builds.
+
+		Parsing only reads the compiled tables and keeps its state in the returned analysis,
+		so the same parser can parse many inputs concurrently in different threads.
+		The analysis itself is not thread-safe: `get_output` memoizes its results in it, so each analysis should be used by one thread at a time.
+		"""
+		if executor is not None and not isinstance(executor, ThreadPoolExecutor):
+			raise TypeError(f"Chart cells can only be filled in a ThreadPoolExecutor, not in {type(executor).__name__}")
+
+		guard = _ParseGuard(cancel, budget) if cancel is not None or budget is not None else None
+		if guard is not None:
+			guard.check_tokens(tokens)
+
+		if stats is None and self.stats_callback is not None:
+			stats = ParseStats()
+
+		if stats is not None:
+			stats.tokens += len(tokens)
+
+		phase_start = time.perf_counter()
+
 		cyk_table: CYKTable = defaultdict(set)
 		split_table: SplitTable = defaultdict(set)
 		token_outputs: TokenOutputTable = defaultdict(set)
 		for i in range(len(tokens)):
 			for rule_name, token_rule in self.token_rules.items():
 				if token_rule.matches_token(tokens[i]):
-					cyk_table[(i, i+1)] |= {rule_name} | self.one_rules_expanded[rule_name]
+					cyk_table[(i, i+1)] |= {rule_name} | self.one_rules_expanded.get(rule_name, set())
+					if stats is not None:
+						stats.lexical_matches += 1
 
 			for rule_name, custom_rule in self.custom_rules.items():
 				if token_output := custom_rule.match(self.grammar, tokens[i:i+1], set()):
 					if not all(isinstance(t, Hashable) for t in token_output):
 						raise ValueError(f"Output of {rule_name} for {tokens[i:i+1]} is not hashable: {token_output}")
-					cyk_table[(i, i+1)] |= {rule_name} | self.one_rules_expanded[rule_name]
+					cyk_table[(i, i+1)] |= {rule_name} | self.one_rules_expanded.get(rule_name, set())
 					token_outputs[(i, i+1, rule_name)] |= set(token_output)
+					if stats is not None:
+						stats.lexical_matches += 1
+
+			if guard is not None:
+				guard.add_chart_items(len(cyk_table[(i, i+1)]))
+
+		if stats is not None:
+			stats.custom_rule_calls += len(tokens) * len(self.custom_rules)
+			stats.lexical_time += time.perf_counter() - phase_start
+			phase_start = time.perf_counter()
 		
-		for span in range(2, len(tokens)+1):
-			for start in range(len(tokens)-span+1):
-				end = start + span
-				for split in range(start+1, end):
-					for rule1 in cyk_table[(start, split)]:
-						for rule2 in cyk_table[(split, end)]:
-							for rule_name in self.two_rules[(rule1, rule2)]:
-								cyk_table[(start, end)] |= {rule_name} | self.one_rules_expanded[rule_name]
-								split_table[(start, end, rule_name)] |= {split}
-
-				for rule_name, custom_rule in self.custom_rules.items():
-					if token_output := custom_rule.match(self.grammar, tokens[start:end], set()):
-						if not all(isinstance(t, Hashable) for t in token_output):
-							raise ValueError(f"Output of {rule_name} for {tokens[start:end]} is not hashable: {token_output}")
-						cyk_table[(start, end)] |= {rule_name} | self.one_rules_expanded[rule_name]
-						token_outputs[(start, end, rule_name)] |= set(token_output)
+		constraints = [(bs, be) for bs, be in constraints if be - bs >= 2] if constraints is not None else []
+		constituents = frozenset((bs, be) for bs, be in constituents if be - bs >= 2) if constituents is not None else frozenset()
+		longest_span = min(len(tokens), max_span) if max_span is not None else len(tokens)
+		parallel = executor is not None and len(tokens) >= parallel_threshold
+		for span in range(2, longest_span+1):
+			cells = [(start, start+span) for start in range(len(tokens)-span+1)]
+			if constituents:
+				# Mikään jäsennyspuun solmu ei voi leikata pakollista rakennetta, ei myöskään pitkien sääntöjen apusymboli
+				cells = [(start, end) for start, end in cells if not crosses_constraint(start, end, constituents)]
+
+			# Saman pituiset jänteet riippuvat vain lyhyemmistä jänteistä, joten ne voidaan täyttää rinnakkain
+			if parallel:
+				assert executor is not None
+				results = executor.map(lambda cell: self._fill_cell(tokens, cyk_table, cell[0], cell[1], guard, constraints, constituents), cells)
+
+			else:
+				results = (self._fill_cell(tokens, cyk_table, start, end, guard, constraints, constituents) for start, end in cells)
+
+			for (start, end), (cell, splits, cell_token_outputs, probes) in zip(cells, results):
+				if cell:
+					cyk_table[(start, end)] = cell
+
+				for rule_name, rule_splits in splits.items():
+					split_table[(start, end, rule_name)] = rule_splits
+
+				for rule_name, outputs in cell_token_outputs.items():
+					token_outputs[(start, end, rule_name)] = outputs
+
+				if stats is not None:
+					stats.binary_rule_probes += probes
+					stats.custom_rule_calls += len(self.custom_rules)
+
+				if guard is not None:
+					guard.add_chart_items(len(cell))
+
+		if stats is not None:
+			stats.chart_time += time.perf_counter() - phase_start
+			for (start, end), cell in list(cyk_table.items()):
+				stats.chart_items_per_span[end - start] = stats.chart_items_per_span.get(end - start, 0) + len(cell)
+
+			if self.stats_callback is not None:
+				self.stats_callback(stats)
 		
-		return CYKAnalysis(self, tokens, cyk_table, split_table, token_outputs)
+		return CYKAnalysis(self, tokens, cyk_table, split_table, token_outputs, guard, stats, constituents)
+
+	def _fill_cell(
+		self,
+		tokens: list[grammar.Token],
+		cyk_table: CYKTable,
+		start: int,
+		end: int,
+		guard: _ParseGuard | None,
+		constraints: Sequence[tuple[int, int]] = (),
+		constituents: AbstractSet[tuple[int, int]] = frozenset(),
+	) -> tuple[set[str], dict[str, set[int]], dict[str, set[OutputT]], int]:
+		"""
+		Computes one chart cell from the shorter spans. Only reads the chart, so cells of the same length can be computed concurrently.
+		Returns the symbols, the splits of each symbol, the outputs of custom rules and the number of binary rule probes.
+		"""
+		if guard is not None:
+			guard.check()
+
+		# Sulkeita leikkaavaan soluun voi tulla vain pitkien sääntöjen apusymboleita, sillä alkuperäisen säännön solmu voi kattaa sulkeet kokonaan
+		helpers_only = bool(constraints) and crosses_constraint(start, end, constraints)
+		cell: set[str] = set()
+		splits: defaultdict[str, set[int]] = defaultdict(set)
+		cell_token_outputs: dict[str, set[OutputT]] = {}
+		probes = 0
+		for split in range(start+1, end):
+			left = cyk_table.get((start, split), ())
+			right = cyk_table.get((split, end), ())
+			if constituents:
+				if splits_constituent(start, split, end, constituents):
+					continue
+
+				right = right_children(cyk_table, split, end, constituents)
+
+			probes += len(left) * len(right)
+			for rule1 in left:
+				for rule2 in right:
+					for rule_name in self.two_rules.get((rule1, rule2), ()):
+						if helpers_only:
+							if is_helper_symbol(rule_name):
+								cell |= self._helper_closure(rule_name)
+								splits[rule_name].add(split)
+
+							continue
+
+						cell.add(rule_name)
+						cell |= self.one_rules_expanded.get(rule_name, set())
+						splits[rule_name].add(split)
+
+		if helpers_only:
+			return cell, splits, cell_token_outputs, probes
+
+		for rule_name, custom_rule in self.custom_rules.items():
+			if token_output := custom_rule.match(self.grammar, tokens[start:end], set()):
+				if not all(isinstance(t, Hashable) for t in token_output):
+					raise ValueError(f"Output of {rule_name} for {tokens[start:end]} is not hashable: {token_output}")
+				cell.add(rule_name)
+				cell |= self.one_rules_expanded.get(rule_name, set())
+				cell_token_outputs[rule_name] = set(token_output)
+
+		return cell, splits, cell_token_outputs, probes
+
+	def _helper_closure(self, helper: str) -> set[str]:
+		"""
+		Returns the helper symbol and the helper symbols that are derived from it over the same span through empty symbols,
+		without deriving any other symbols in between.
+		"""
+		ans = {helper}
+		queue = [helper]
+		while queue:
+			symbol = queue.pop()
+			# Apusymbolit ovat aina binäärisäännön oikealla puolella
+			for zero_rule in self.zero_rules:
+				for rule_name in self.two_rules.get((zero_rule, symbol), ()):
+					if is_helper_symbol(rule_name) and rule_name not in ans:
+						ans.add(rule_name)
+						queue.append(rule_name)
+
+		return ans
 
 	def print(self):
 		print("Token rules:")
@@ -196,26 +561,124 @@ class CYKParser[OutputT]:
 			print(repr(a), repr(b))
 
 
+def crosses_constraint(start: int, end: int, constraints: Iterable[tuple[int, int]]) -> bool:
+	"""
+	Returns true if the span `start:end` partially overlaps one of the bracketing spans.
+	"""
+	return any(start < bs < end < be or bs < start < be < end for bs, be in constraints)
+
+
+def splits_constituent(start: int, split: int, end: int, constituents: Iterable[tuple[int, int]]) -> bool:
+	"""
+	Returns true if splitting the span `start:end` at `split` divides a span that must be a constituent and that the span strictly contains.
+	"""
+	return any(start <= bs < split < be <= end and (start, end) != (bs, be) for bs, be in constituents)
+
+
+def is_helper_symbol(symbol: str) -> bool:
+	"""
+	Returns true if the symbol is a helper symbol (`_CONT`) of a binarized long rule.
+	"""
+	# Laajennetut välikkeiden nimet päättyvät aina piirrelistaan, apusymbolien nimet numeroon
+	return symbol.startswith(".") and "_CONT" in symbol and not symbol.endswith("}")
+
+
+def right_children(cyk_table: CYKTable, start: int, end: int, constituents: AbstractSet[tuple[int, int]]) -> AbstractSet[str]:
+	"""
+	Returns the symbols of the chart cell that can be the right child of a binary rule.
+
+	A helper symbol cannot cover a span that must be a constituent, because the rule it belongs to would then divide the span.
+	"""
+	cell = cyk_table.get((start, end), set())
+	if (start, end) in constituents:
+		return {symbol for symbol in cell if not is_helper_symbol(symbol)}
+
+	return cell
+
+
 class CYKAnalysis[OutputT]:
 	memoized_outputs: dict[tuple[str, int, int], frozenset[OutputT | "DenormalizedArgs[OutputT]"] | None]
-	def __init__(self, cyk_parser: CYKParser[OutputT], tokens: list[grammar.Token], cyk_table: CYKTable, split_table: SplitTable, token_outputs: TokenOutputTable):
+	def __init__(self, cyk_parser: CYKParser[OutputT], tokens: list[grammar.Token], cyk_table: CYKTable, split_table: SplitTable, token_outputs: TokenOutputTable, guard: _ParseGuard | None = None, stats: ParseStats | None = None, constituents: AbstractSet[tuple[int, int]] = frozenset()):
 		self.cyk_parser = cyk_parser
 		self.tokens = tokens
 		self.cyk_table = cyk_table
 		self.split_table = split_table
 		self.token_outputs = token_outputs
+		self.guard = guard
+		self.stats = stats
+		self.constituents = constituents
 		self.memoized_outputs = {}
+		self._counting_forest: "ParseForest[OutputT] | None" = None
+		# Saman analyysin argumenttilistat internoidaan, jolloin joukkojen vertailut päättyvät yleensä jo identtisyystarkistukseen
+		self.interned_args: InternTable[OutputT] = {}
 
 	def get_output(self, rule_name: str, start: int = 0, end: int = 0, memoize=True) -> frozenset[OutputT] | None:
-		ans = self._get_output(rule_name, start, end, memoize=memoize)
+		if self.stats is None:
+			ans = self._get_output(rule_name, start, end, memoize=memoize)
+
+		else:
+			phase_start = time.perf_counter()
+			ans = self._get_output(rule_name, start, end, memoize=memoize)
+			self.stats.output_time += time.perf_counter() - phase_start
+			if self.cyk_parser.stats_callback is not None:
+				self.cyk_parser.stats_callback(self.stats)
+
 		assert ans is None or all(not isinstance(arg, DenormalizedArgs) for arg in ans)
 		return ans  # type: ignore
 
+	def count_derivations(self, rule_name: str, start: int = 0, end: int = 0) -> int:
+		"""
+		Returns the number of derivations of `rule_name` over the span, computed from the chart without evaluating any outputs.
+
+		Equal outputs are merged in the set returned by `get_output`, so the count is an upper bound of its size.
+		Custom rules and nullable symbols count as one derivation per output value.
+		The counts are computed with `ParseForest.count_derivations` in a forest that is kept with the analysis, so they are memoized between calls.
+		"""
+		if end <= 0:
+			end = len(self.tokens) - end
+
+		if self._counting_forest is None:
+			self._counting_forest = self.forest(rule_name, start, end)
+
+		return self._counting_forest.count_derivations(self._counting_forest.node(rule_name, start, end))
+
+	def find_spans(self, rule_name: str, non_overlapping: bool = True) -> list[tuple[int, int]]:
+		"""
+		Returns the spans `(start, end)` that `rule_name` matches, in order of their start and end positions.
+
+		If `non_overlapping` is true, the spans are chosen greedily from left to right, taking the longest span at each position,
+		so the result contains the maximal non-overlapping matches.
+		"""
+		spans = sorted((start, end) for (start, end), cell in self.cyk_table.items() if start < end and rule_name in cell)
+		if not non_overlapping:
+			return spans
+
+		ans: list[tuple[int, int]] = []
+		longest: dict[int, int] = {}
+		for start, end in spans:
+			longest[start] = max(longest.get(start, end), end)
+
+		position = 0
+		for start in sorted(longest):
+			if start >= position:
+				ans.append((start, longest[start]))
+				position = longest[start]
+
+		return ans
+
+	def forest(self, rule_name: str, start: int = 0, end: int = 0) -> "ParseForest[OutputT]":
+		"""
+		Returns the shared packed parse forest of the derivations of `rule_name` over the span.
+		"""
+		from .forest import ParseForest
+		return ParseForest(self, rule_name, start, end)
+
 	def _get_output(self, rule_name: str, start: int, end: int, memoize: bool) -> frozenset[OutputT | "DenormalizedArgs[OutputT]"] | None:
 		if end <= 0:
 			end = len(self.tokens) - end
 
-		if rule_name not in self.cyk_table[(start, end)]:
+		cell = self.cyk_table.get((start, end), set())
+		if rule_name not in cell:
 			return frozenset()
 
 		if not rule_name.startswith(".") or rule_name == ".":  # jos kyseessä on terminaali
@@ -227,45 +690,62 @@ class CYKAnalysis[OutputT]:
 		if memoize:
 			key = (rule_name, start, end)
 			if key in self.memoized_outputs:
+				if self.stats is not None:
+					self.stats.memo_hits += 1
+
 				return self.memoized_outputs[key]
 
+		if self.guard is not None:
+			self.guard.check()
+
 		ans: set[OutputT | DenormalizedArgs] = set()
 		if token_output := self.token_outputs.get((start, end, rule_name), None):
 			ans |= token_output
 
-		for rule in self.cyk_table[(start, end)]:
+		for rule in cell:
 			for output in self.cyk_parser.outputs.get((rule_name, rule), []):
-				args = self.get_output(rule, start, end)
+				args = self._get_output(rule, start, end, memoize=True)
 				assert isinstance(output, grammar.Output)
+				if self.stats is not None:
+					self.stats.output_evaluations += len(args) if args is not None else 1
+
 				if args is None:
 					ans.add(output.eval(()))
 				else:
 					for arg in args:
+						assert not isinstance(arg, DenormalizedArgs)
 						ans.add(output.eval((arg,)))
 
-		for split in self.split_table[(start, end, rule_name)]:
-			for rule1 in self.cyk_table[(start, split)]:
-				for rule2 in self.cyk_table[(split, end)]:
+		for split in self.split_table.get((start, end, rule_name), ()):
+			right = right_children(self.cyk_table, split, end, self.constituents) if self.constituents else self.cyk_table.get((split, end), ())
+			for rule1 in self.cyk_table.get((start, split), ()):
+				for rule2 in right:
 					for output in self.cyk_parser.outputs.get((rule_name, (rule1, rule2)), []):
 						args1 = self._get_output(rule1, start, split, memoize)
 						args2 = self._get_output(rule2, split, end, memoize)
 
 						self._add_two_rule_output(ans, output, args1, args2)
 
-		for zero_rule, rule2 in self.cyk_parser.two_rules_zero_left[rule_name]:
-			if rule2 in self.cyk_table[(start, end)]:
+			if self.guard is not None:
+				ans = self.guard.limit_outputs(ans)
+
+		for zero_rule, rule2 in self.cyk_parser.two_rules_zero_left.get(rule_name, ()):
+			if rule2 in cell:
 				for output in self.cyk_parser.outputs.get((rule_name, (zero_rule, rule2)), []):
 					args1 = self.cyk_parser.zero_outputs[zero_rule]
 					args2 = self._get_output(rule2, start, end, memoize)
 					self._add_two_rule_output(ans, output, args1, args2)
 
-		for rule1, zero_rule in self.cyk_parser.two_rules_zero_right[rule_name]:
-			if rule1 in self.cyk_table[(start, end)]:
+		for rule1, zero_rule in self.cyk_parser.two_rules_zero_right.get(rule_name, ()):
+			if rule1 in cell:
 				for output in self.cyk_parser.outputs.get((rule_name, (rule1, zero_rule)), []):
 					args1 = self._get_output(rule1, start, end, memoize)
 					args2 = self.cyk_parser.zero_outputs[zero_rule]
 					self._add_two_rule_output(ans, output, args1, args2)
 
+		if self.guard is not None:
+			ans = self.guard.limit_outputs(ans)
+
 		result = frozenset(ans)
 
 		if memoize:
@@ -287,6 +767,9 @@ class CYKAnalysis[OutputT]:
 			args2 = frozenset({None})
 
 		assert args1 and args2 and len(args1) > 0 and len(args2) > 0
+		if self.stats is not None:
+			self.stats.output_evaluations += len(args1) * len(args2)
+
 		for arg1 in args1:
 			assert not isinstance(arg1, DenormalizedArgs)
 			for arg2 in args2:
@@ -296,11 +779,11 @@ class CYKAnalysis[OutputT]:
 
 				elif isinstance(output, DenormalizeStartOutput):
 					assert not isinstance(arg2, DenormalizedArgs)
-					ans.add(output.start_chain(arg1, arg2))
+					ans.add(output.start_chain(arg1, arg2, self.interned_args))
 
 				elif isinstance(output, DenormalizeChainOutput):
 					assert isinstance(arg2, DenormalizedArgs)
-					ans.add(output.continue_chain(arg1, arg2))
+					ans.add(output.continue_chain(arg1, arg2, self.interned_args))
 
 				elif isinstance(output, DenormalizeEndOutput):
 					assert isinstance(arg2, DenormalizedArgs)
@@ -320,7 +803,7 @@ class CYKAnalysis[OutputT]:
 		table = [[("" if row <= col else "X") for col in range(size)] for row in range(size)]
 		for start in range(size):
 			for end in range(start+1, size+1):
-				table[end-start-1][end-1] = ", ".join(sorted(self.cyk_table[(start, end)]))
+				table[end-start-1][end-1] = ", ".join(sorted(self.cyk_table.get((start, end), ())))
 		
 		rtable = Table(show_lines=True, show_footer=True)
 		for token in self.tokens:
@@ -331,8 +814,98 @@ class CYKAnalysis[OutputT]:
 		rich.print(rtable)
 
 
-class DenormalizedArgs[OutputT](NamedTuple):
-	args: tuple[OutputT, ...]
+class DenormalizedArgs[OutputT]:
+	"""
+	The outputs of the nonterminals in the already parsed part of a binarized rule.
+
+	The arguments are stored as an immutable linked list, so that prepending an argument shares the tail instead of copying it.
+	The hash is computed once when the cell is created.
+	The arguments are materialized into a tuple only once, in `DenormalizeEndOutput.end_chain`.
+	"""
+
+	__slots__ = ("head", "tail", "length", "_hash")
+
+	head: OutputT | None
+	tail: "DenormalizedArgs[OutputT] | None"
+	length: int
+
+	def __init__(self, head: OutputT | None = None, tail: "DenormalizedArgs[OutputT] | None" = None):
+		self.head = head
+		self.tail = tail
+		if tail is None:
+			self.length = 0
+			self._hash = hash(())
+
+		else:
+			self.length = tail.length + 1
+			self._hash = hash((head, tail._hash))
+
+	def prepend(self, arg: OutputT, intern: "InternTable[OutputT] | None" = None) -> "DenormalizedArgs[OutputT]":
+		"""
+		Returns a list with `arg` prepended to this list.
+		If an intern table is given, equal lists built through it are the same object.
+		"""
+		if intern is None:
+			return DenormalizedArgs(arg, self)
+
+		# Häntä on jo internoitu, joten sen identiteetti riittää avaimeksi
+		key = (arg, id(self))
+		ans = intern.get(key)
+		if ans is None:
+			ans = intern[key] = DenormalizedArgs(arg, self)
+
+		return ans
+
+	@property
+	def args(self) -> tuple[OutputT, ...]:
+		return tuple(self)
+
+	def __iter__(self) -> Iterator[OutputT]:
+		node = self
+		while node.tail is not None:
+			# Vain tyhjän listan päässä on None
+			assert node.head is not None
+			yield node.head
+			node = node.tail
+
+	def __len__(self):
+		return self.length
+
+	def __hash__(self):
+		return self._hash
+
+	def __eq__(self, other):
+		if not isinstance(other, DenormalizedArgs):
+			return NotImplemented
+
+		a: DenormalizedArgs | None = self
+		b: DenormalizedArgs | None = other
+		while a is not b:
+			if a is None or b is None or a._hash != b._hash or a.length != b.length or a.head != b.head:
+				return False
+
+			a, b = a.tail, b.tail
+
+		return True
+
+	def __repr__(self):
+		return "DenormalizedArgs(" + repr(self.args) + ")"
+
+	def __reduce__(self):
+		return _denormalized_args, (self.args,)
+
+
+def _denormalized_args[OutputT](args: tuple[OutputT, ...]) -> DenormalizedArgs[OutputT]:
+	ans: DenormalizedArgs[OutputT] = EMPTY_DENORMALIZED_ARGS
+	for arg in reversed(args):
+		ans = ans.prepend(arg)
+
+	return ans
+
+
+EMPTY_DENORMALIZED_ARGS: DenormalizedArgs = DenormalizedArgs()
+
+type InternTable[OutputT] = dict[tuple[OutputT, int], DenormalizedArgs[OutputT]]
 
 
 class DenormalizeStartOutput[OutputT]:
@@ -343,21 +916,21 @@ class DenormalizeStartOutput[OutputT]:
 	def __repr__(self):
 		return "DenormalizeStartOutput()"
 
-	def start_chain(self, a: OutputT | None, b: OutputT | None) -> DenormalizedArgs[OutputT]:
+	def start_chain(self, a: OutputT | None, b: OutputT | None, intern: "InternTable[OutputT] | None" = None) -> DenormalizedArgs[OutputT]:
 		if self.a_is_nonterminal and self.b_is_nonterminal:
 			assert a is not None and b is not None
-			return DenormalizedArgs((a, b))
+			return EMPTY_DENORMALIZED_ARGS.prepend(b, intern).prepend(a, intern)
 		
 		elif self.a_is_nonterminal:
 			assert a is not None and b is None
-			return DenormalizedArgs((a,))
+			return EMPTY_DENORMALIZED_ARGS.prepend(a, intern)
 		
 		elif self.b_is_nonterminal:
 			assert a is None and b is not None
-			return DenormalizedArgs((b,))
+			return EMPTY_DENORMALIZED_ARGS.prepend(b, intern)
 		
 		else:
-			return DenormalizedArgs(())
+			return EMPTY_DENORMALIZED_ARGS
 
 
 class DenormalizeChainOutput[OutputT]:
@@ -367,10 +940,10 @@ class DenormalizeChainOutput[OutputT]:
 	def __repr__(self):
 		return "DenormalizeChainOutput()"
 
-	def continue_chain(self, arg: OutputT | None, args: DenormalizedArgs) -> DenormalizedArgs[OutputT]:
+	def continue_chain(self, arg: OutputT | None, args: DenormalizedArgs[OutputT], intern: "InternTable[OutputT] | None" = None) -> DenormalizedArgs[OutputT]:
 		if self.a_is_nonterminal:
 			assert arg is not None
-			return DenormalizedArgs((arg,) + args.args)
+			return args.prepend(arg, intern)
 		
 		else:
 			assert arg is None
@@ -385,13 +958,11 @@ class DenormalizeEndOutput[OutputT]:
 	def __repr__(self):
 		return "DenormalizeEndOutput(" + repr(self.output) + ")"
 
-	def end_chain(self, arg: OutputT | None, args: DenormalizedArgs) -> OutputT:
+	def end_chain(self, arg: OutputT | None, args: DenormalizedArgs[OutputT]) -> OutputT:
 		if self.a_is_nonterminal:
 			assert arg is not None
-			args = DenormalizedArgs((arg,) + args.args)
+			return self.output.eval((arg, *args))
 		
 		else:
 			assert arg is None
-			args = args
-
-		return self.output.eval(args.args)
+			return self.output.eval(tuple(args))
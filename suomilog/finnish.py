@@ -14,17 +14,81 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import functools
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Sequence
 import pypykko.utils as pykko
 from pypykko.reinflect import reinflect as pykko_reinflect
 from pypykko.tokenizer import text2tokens as pykko_tokenize
 from . import grammar
+from .lexicon import AnalysisLexicon, InflectionLexicon
 
-DICTIONARY: defaultdict[str, list[grammar.Token]] = defaultdict(list)
+DICTIONARY: defaultdict[str, list[tuple[str, set[str]]]] = defaultdict(list)
 
 def tokenize(text: str) -> list[grammar.Token]:
-	old_tokens: list[str] = pykko_tokenize(text)
+	tokens: list[grammar.Token] = []
+	for token in _merge_quotes(pykko_tokenize(text)):
+		if analyzed_token := _analyze_token(token):
+			tokens.append(analyzed_token)
+
+	return tokens
+
+SENTENCE_END = re.compile(r"[.!?…]+[\"'»”’)]*(?=\s+[\"'«»”(–-]?[A-ZÅÄÖ0-9])|(?=\n\s*\n)")
+
+def tokenize_stream(source: str | Iterable[str], max_sentence_length: int = 100_000) -> Iterator[list[grammar.Token]]:
+	"""
+	Tokenizes text sentence by sentence.
+
+	`source` can be a string, a file or any iterable of text chunks.
+	Chunks are read only as far as needed to find the next sentence boundary, so the first sentences can be processed before the whole document has been read.
+	A sentence boundary is sentence-final punctuation followed by a capitalized word, or an empty line.
+	If no boundary is found within `max_sentence_length` characters, the text is split at the last whitespace.
+	"""
+	if isinstance(source, str):
+		source = [source]
+
+	buffer = ""
+	for chunk in source:
+		buffer += chunk
+		pos = 0
+		for match in SENTENCE_END.finditer(buffer):
+			if sentence := buffer[pos:match.end()].strip():
+				yield tokenize(sentence)
+
+			pos = match.end()
+
+		buffer = buffer[pos:]
+		while len(buffer) > max_sentence_length:
+			split = buffer.rfind(" ", 0, max_sentence_length)
+			split = split if split > 0 else max_sentence_length
+			if sentence := buffer[:split].strip():
+				yield tokenize(sentence)
+
+			buffer = buffer[split:]
+
+	if sentence := buffer.strip():
+		yield tokenize(sentence)
+
+def quote_constraints(tokens: list[grammar.Token]) -> list[tuple[int, int]]:
+	"""
+	Returns the spans of quoted segments (between tokens with `-lquote` and `-rquote` bits) as bracketing constraints for `CYKParser.parse`.
+	A quote of one token gives a span of one token, which does not restrict the parse. Parentheses and commas are not recognized.
+	"""
+	spans: list[tuple[int, int]] = []
+	opened: list[int] = []
+	for i, token in enumerate(tokens):
+		bits = set().union(*(altbits for _, altbits in token.alternatives))
+		if "-lquote" in bits:
+			opened.append(i)
+
+		if "-rquote" in bits and opened:
+			spans.append((opened.pop(), i+1))
+
+	return spans
+
+def _merge_quotes(old_tokens: list[str]) -> list[str]:
 	new_tokens: list[str] = []
 	i = 0
 	while i < len(old_tokens):
@@ -46,42 +110,62 @@ def tokenize(text: str) -> list[grammar.Token]:
 		new_tokens.append(old_tokens[i])
 		i += 1
 
-	tokens: list[grammar.Token] = []
-	token: str
-	for token in new_tokens:
-		tokenizer_bits = set()
-		if token[:1] == "\"":
-			token = token[1:]
-			tokenizer_bits.add("-lquote")
-
-		if token[-1:] == "\"":
-			token = token[:-1]
-			tokenizer_bits.add("-rquote")
-
-		if token[:1] == "-":
-			token = token[1:]
-			tokenizer_bits.add("-lhyphen")
-
-		if token[-1:] == "-":
-			token = token[:-1]
-			tokenizer_bits.add("-rhyphen")
-
-		if token.strip() == "":
-			continue
+	return new_tokens
 
-		alternatives = []
-		for word in pykko.analyze(token):
-			baseform, bits = baseformAndBits(word)
-			bits |= tokenizer_bits
-			alternatives.append((baseform, bits))
+def _analyze_token(token: str) -> grammar.Token | None:
+	token, tokenizer_bits = _strip_token(token)
+	if token.strip() == "":
+		return None
 
-		# Jos sana löytyy suomilogin omasta sanakirjasta, lisää myös sieltä vaihtoehdot
-		if token.lower() in DICTIONARY:
-			alternatives += DICTIONARY[token.lower()]
+	alternatives = []
+	for baseform, bits in _analyze_word(token):
+		bits |= tokenizer_bits
+		alternatives.append((baseform, bits))
 
-		tokens.append(grammar.Token(token, alternatives))
+	# Jos sana löytyy suomilogin omasta sanakirjasta, lisää myös sieltä vaihtoehdot
+	if extra_alternatives := DICTIONARY.get(token.lower()):
+		alternatives += extra_alternatives
 
-	return tokens
+	return grammar.Token(token, alternatives)
+
+def _strip_token(token: str) -> tuple[str, set[str]]:
+	"""
+	Removes quotes and hyphens around the token and returns them as bits.
+	"""
+	tokenizer_bits = set()
+	if token[:1] == "\"":
+		token = token[1:]
+		tokenizer_bits.add("-lquote")
+
+	if token[-1:] == "\"":
+		token = token[:-1]
+		tokenizer_bits.add("-rquote")
+
+	if token[:1] == "-":
+		token = token[1:]
+		tokenizer_bits.add("-lhyphen")
+
+	if token[-1:] == "-":
+		token = token[:-1]
+		tokenizer_bits.add("-rhyphen")
+
+	return token, tokenizer_bits
+
+ANALYSIS_LEXICON: AnalysisLexicon | None = None
+
+def load_analysis_lexicon(path: str | None):
+	"""
+	Loads a lexicon written by `lexicon.write_analysis_lexicon`, which `tokenize` consults before pypykko.
+	None unloads the current lexicon.
+	"""
+	global ANALYSIS_LEXICON
+	ANALYSIS_LEXICON = AnalysisLexicon(path) if path is not None else None
+
+def _analyze_word(word: str) -> list[tuple[str, set[str]]]:
+	if ANALYSIS_LEXICON is not None and (alternatives := ANALYSIS_LEXICON.lookup(word)) is not None:
+		return alternatives
+
+	return [baseformAndBits(analysis) for analysis in pykko.analyze(word)]
 
 def baseformAndBits(word: pykko.PykkoAnalysis) -> tuple[str, set[str]]:
 	bits: set[str] = set()
@@ -122,7 +206,91 @@ PLURAL_CASES = [
 	"+com",
 ]
 
-def inflect_nominal(word: str, plural_tag: str, case_tag: str, poss_tag: str = ""):
+POSSESSIVE_SUFFIXES = [
+	"+poss1sg",
+	"+poss2sg",
+	"+poss1pl",
+	"+poss2pl",
+	"+poss3",
+]
+
+# (luku, sija, omistusliite)
+type ParadigmTag = tuple[str, str, str]
+
+def paradigm_tags(possessives: bool = True) -> list[ParadigmTag]:
+	"""
+	Returns the (number, case, possessive) tag combinations of the full nominal paradigm.
+	The comitative and the instructive are only included in plural.
+	"""
+	tags: list[ParadigmTag] = []
+	for poss_tag in (POSSESSIVE_SUFFIXES if possessives else []) + [""]:
+		for case_tag in SINGULAR_AND_PLURAL_CASES:
+			for plural_tag in ("+sg", "+pl"):
+				tags.append((plural_tag, case_tag, poss_tag))
+
+		for case_tag in PLURAL_CASES:
+			tags.append(("+pl", case_tag, poss_tag))
+
+	return tags
+
+def inflect_paradigm(word: str, tags: Iterable[ParadigmTag] | None = None) -> dict[ParadigmTag, list[str]]:
+	"""
+	Inflects a nominal to all given forms, by default to the full paradigm returned by `paradigm_tags`.
+	"""
+	return {tag: inflect_nominal(word, *tag) for tag in (tags if tags is not None else paradigm_tags())}
+
+INFLECTION_CACHE_SIZE = 100_000
+
+def inflect_nominal(word: str, plural_tag: str, case_tag: str, poss_tag: str = "") -> list[str]:
+	"""
+	Inflects a nominal to the given number, case and possessive suffix.
+
+	The results are cached (see `clear_inflection_cache`), and the word is analyzed only once for all tag combinations.
+	"""
+	_check_tags(plural_tag, case_tag)
+
+	# Palautetaan kopio, jotta kutsuja ei voi muuttaa välimuistissa olevaa tulosta
+	return list(_inflect_nominal(word, plural_tag, case_tag, poss_tag))
+
+def inflect_nominals(requests: Iterable[Sequence[str]], processes: int = 0, chunksize: int = 64) -> list[list[str]]:
+	"""
+	Inflects many nominals at once.
+
+	Each request is a tuple (word, number, case) or (word, number, case, possessive), as in the arguments of `inflect_nominal`.
+	The results are returned in the order of the requests.
+	Duplicate requests are inflected only once, and the requests are grouped by word so that each word is analyzed only once.
+	If `processes` is positive, the words are divided among a pool of that many processes.
+	The loaded lexicons are passed to the workers (see `_worker_state`).
+	"""
+	keys = [(request[0], request[1], request[2], request[3] if len(request) > 3 else "") for request in requests]
+
+	tags_by_word: defaultdict[str, set[tuple[str, str, str]]] = defaultdict(set)
+	for word, plural_tag, case_tag, poss_tag in keys:
+		tags_by_word[word].add((plural_tag, case_tag, poss_tag))
+
+	for plural_tag, case_tag in {(key[1], key[2]) for key in keys}:
+		_check_tags(plural_tag, case_tag)
+
+	groups = [(word, sorted(tags)) for word, tags in tags_by_word.items()]
+	if processes > 0:
+		with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(_worker_state(),)) as executor:
+			results = list(executor.map(_inflect_word, groups, chunksize=chunksize))
+
+	else:
+		results = list(map(_inflect_word, groups))
+
+	inflected: dict[tuple[str, str, str, str], tuple[str, ...]] = {}
+	for (word, tags), forms in zip(groups, results):
+		for tag, form in zip(tags, forms):
+			inflected[word, *tag] = form
+
+	return [list(inflected[key]) for key in keys]
+
+def _inflect_word(group: tuple[str, list[tuple[str, str, str]]]) -> list[tuple[str, ...]]:
+	word, tags = group
+	return [_inflect_nominal(word, *tag) for tag in tags]
+
+def _check_tags(plural_tag: str, case_tag: str):
 	assert plural_tag in ["+sg", "+pl"], plural_tag
 	if plural_tag == "+pl":
 		assert case_tag in SINGULAR_AND_PLURAL_CASES + PLURAL_CASES, f"{case_tag} not in {SINGULAR_AND_PLURAL_CASES + PLURAL_CASES}"
@@ -130,32 +298,74 @@ def inflect_nominal(word: str, plural_tag: str, case_tag: str, poss_tag: str = "
 	else:
 		assert case_tag in SINGULAR_AND_PLURAL_CASES, f"{case_tag} not in {SINGULAR_AND_PLURAL_CASES}"
 
-	new_morphtags = []
-	for analysis in pykko.analyze(word):
-		morphtags: list[str] = re.split(r"(?=\+)", analysis.morphtags)
+INFLECTION_LEXICON: InflectionLexicon | None = None
+
+def load_inflection_lexicon(path: str | None):
+	"""
+	Loads a lexicon written by `lexicon.write_inflection_lexicon`, which `inflect_nominal` consults before pypykko.
+	None unloads the current lexicon.
+	"""
+	global INFLECTION_LEXICON
+	INFLECTION_LEXICON = InflectionLexicon(path) if path is not None else None
+	clear_inflection_cache()
+
+type WorkerState = tuple[dict[str, list[tuple[str, set[str]]]], str | None, str | None]
+
+def _worker_state() -> WorkerState:
+	"""
+	Returns the runtime settings of this module: the entries of `DICTIONARY` and the paths of the loaded lexicons.
+	Worker processes started with spawn or forkserver do not inherit them, so they must be restored with `_init_worker`.
+	"""
+	return (
+		dict(DICTIONARY),
+		ANALYSIS_LEXICON.path if ANALYSIS_LEXICON is not None else None,
+		INFLECTION_LEXICON.path if INFLECTION_LEXICON is not None else None,
+	)
+
+def _init_worker(state: WorkerState):
+	dictionary, analysis_lexicon, inflection_lexicon = state
+	DICTIONARY.clear()
+	DICTIONARY.update(dictionary)
+	load_analysis_lexicon(analysis_lexicon)
+	load_inflection_lexicon(inflection_lexicon)
+
+def clear_inflection_cache():
+	_inflect_nominal.cache_clear()
+	_nominal_morphtags.cache_clear()
+
+@functools.lru_cache(maxsize=INFLECTION_CACHE_SIZE)
+def _inflect_nominal(word: str, plural_tag: str, case_tag: str, poss_tag: str) -> tuple[str, ...]:
+	if INFLECTION_LEXICON is not None and (forms := INFLECTION_LEXICON.lookup(word, plural_tag, case_tag, poss_tag)) is not None:
+		return tuple(forms)
+
+	morphtags = _nominal_morphtags(word)
+	if morphtags is None:
+		new_morphtags = [plural_tag, case_tag]
+
+	else:
 		new_morphtags = []
-		is_nominal = False
 		for tag in morphtags:
-			if tag == "+conneg":
-				is_nominal = False
-				break
-
 			if tag == "+sg" or tag == "+pl":
 				new_morphtags.append(plural_tag)
-				is_nominal = True
 			
 			elif tag in SINGULAR_AND_PLURAL_CASES or tag in PLURAL_CASES:
 				new_morphtags.append(case_tag)
 			
 			else:
 				new_morphtags.append(tag)
-		
-		if is_nominal:
-			break
-	
-	else:
-		new_morphtags = [plural_tag, case_tag]
 
 	new_morphtags.append(poss_tag)
 
-	return pykko_reinflect(word, "".join(new_morphtags))
+	return tuple(pykko_reinflect(word, "".join(new_morphtags)))
+
+@functools.lru_cache(maxsize=INFLECTION_CACHE_SIZE)
+def _nominal_morphtags(word: str) -> tuple[str, ...] | None:
+	"""
+	Returns the morphtags of the first nominal analysis of the word, or None if the word has no nominal analyses.
+	"""
+	for analysis in pykko.analyze(word):
+		morphtags: list[str] = re.split(r"(?=\+)", analysis.morphtags)
+		if "+conneg" not in morphtags and ("+sg" in morphtags or "+pl" in morphtags):
+			return tuple(morphtags)
+
+	return None
@@ -0,0 +1,248 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Shared packed parse forests.
+
+A `ParseForest` is a view of the chart of a `CYKAnalysis`. It has one `SymbolNode` for each symbol and span,
+shared by all derivations that use it, and each node has a list of packed alternatives (`PackedNode`),
+one for each rule and split that derives it.
+The size of the forest is polynomial in the length of the input even if the number of derivations is exponential.
+
+The nodes are built lazily when their alternatives are first accessed.
+The forest follows the binarized grammar, so the helper symbols of long rules (`_CONT`) appear as nodes.
+"""
+
+from typing import Iterator, NamedTuple
+from .cykparser import CYKAnalysis, DenormalizeChainOutput, DenormalizeEndOutput, DenormalizeStartOutput, DenormalizedArgs, NormalizedOutput, right_children
+from . import grammar
+
+
+class PackedNode[OutputT](NamedTuple):
+	"""
+	One way to derive a symbol node: either a rule output applied to one or two child nodes,
+	or a set of ready values (the outputs of a custom rule or of a nullable symbol).
+	"""
+
+	output: NormalizedOutput[OutputT] | None
+	children: tuple["SymbolNode[OutputT]", ...]
+	values: frozenset[OutputT] | None = None
+
+
+class SymbolNode[OutputT]:
+	"""
+	A symbol over the span `start:end`. Terminals have no alternatives.
+	"""
+
+	def __init__(self, forest: "ParseForest[OutputT]", symbol: str, start: int, end: int):
+		self.forest = forest
+		self.symbol = symbol
+		self.start = start
+		self.end = end
+		self._families: list[PackedNode[OutputT]] | None = None
+
+	def __repr__(self):
+		return f"SymbolNode({self.symbol!r}, {self.start}, {self.end})"
+
+	@property
+	def is_terminal(self) -> bool:
+		return not self.symbol.startswith(".") or self.symbol == "."
+
+	@property
+	def in_chart(self) -> bool:
+		return self.symbol in self.forest.analysis.cyk_table.get((self.start, self.end), ())
+
+	@property
+	def families(self) -> list[PackedNode[OutputT]]:
+		if self._families is None:
+			self._families = self.forest._build_families(self)
+
+		return self._families
+
+	def count_derivations(self) -> int:
+		return self.forest.count_derivations(self)
+
+	def trees(self) -> Iterator["ParseTree[OutputT]"]:
+		return self.forest.trees(self)
+
+	def evaluate(self) -> frozenset[OutputT] | None:
+		"""
+		Evaluates the outputs of all derivations of this node with `CYKAnalysis.get_output`.
+		"""
+		return self.forest.analysis.get_output(self.symbol, self.start, self.end)
+
+
+class ParseTree[OutputT](NamedTuple):
+	"""
+	One derivation. Leaves are terminals (`value` is None) or ready values of custom rules and nullable symbols.
+	"""
+
+	symbol: str
+	start: int
+	end: int
+	output: NormalizedOutput[OutputT] | None
+	children: tuple["ParseTree[OutputT]", ...]
+	value: OutputT | None = None
+
+	def evaluate(self) -> OutputT | None:
+		"""
+		Evaluates the output of this derivation only.
+		"""
+		return self._evaluate()  # type: ignore
+
+	def _evaluate(self) -> OutputT | DenormalizedArgs[OutputT] | None:
+		if self.output is None:
+			return self.value
+
+		args = [child._evaluate() for child in self.children]
+		if len(args) == 1:
+			return self.output.eval(()) if args[0] is None else self.output.eval((args[0],))  # type: ignore
+
+		arg1, arg2 = args
+		if isinstance(self.output, grammar.Output):
+			return self.output.eval([arg for arg in (arg1, arg2) if arg is not None])  # type: ignore
+
+		elif isinstance(self.output, DenormalizeStartOutput):
+			assert not isinstance(arg1, DenormalizedArgs) and not isinstance(arg2, DenormalizedArgs)
+			return self.output.start_chain(arg1, arg2)
+
+		elif isinstance(self.output, DenormalizeChainOutput):
+			return self.output.continue_chain(arg1, arg2)  # type: ignore
+
+		else:
+			assert isinstance(self.output, DenormalizeEndOutput)
+			return self.output.end_chain(arg1, arg2)  # type: ignore
+
+
+class ParseForest[OutputT]:
+	def __init__(self, analysis: CYKAnalysis[OutputT], rule_name: str, start: int = 0, end: int = 0):
+		if end <= 0:
+			end = len(analysis.tokens) - end
+
+		self.analysis = analysis
+		self.nodes: dict[tuple[str, int, int], SymbolNode[OutputT]] = {}
+		self._counts: dict[SymbolNode[OutputT], int] = {}
+		self.root = self.node(rule_name, start, end)
+
+	def node(self, symbol: str, start: int, end: int) -> SymbolNode[OutputT]:
+		key = (symbol, start, end)
+		if key not in self.nodes:
+			self.nodes[key] = SymbolNode(self, symbol, start, end)
+
+		return self.nodes[key]
+
+	def _build_families(self, node: SymbolNode[OutputT]) -> list[PackedNode[OutputT]]:
+		analysis = self.analysis
+		parser = analysis.cyk_parser
+		symbol, start, end = node.symbol, node.start, node.end
+		if node.is_terminal:
+			return []
+
+		if start == end:
+			return [PackedNode(None, (), parser.zero_outputs[symbol])]
+
+		if not node.in_chart:
+			return []
+
+		cell = analysis.cyk_table[(start, end)]
+
+		if analysis.guard is not None:
+			analysis.guard.check()
+
+		families: list[PackedNode[OutputT]] = []
+		if token_output := analysis.token_outputs.get((start, end, symbol), None):
+			families.append(PackedNode(None, (), frozenset(token_output)))
+
+		for child in cell:
+			for output in parser.outputs.get((symbol, child), []):
+				families.append(PackedNode(output, (self.node(child, start, end),)))
+
+		for split in sorted(analysis.split_table.get((start, end, symbol), ())):
+			right_cell = right_children(analysis.cyk_table, split, end, analysis.constituents)
+			for left in analysis.cyk_table.get((start, split), ()):
+				for right in right_cell:
+					for output in parser.outputs.get((symbol, (left, right)), []):
+						families.append(PackedNode(output, (self.node(left, start, split), self.node(right, split, end))))
+
+		for zero_rule, right in parser.two_rules_zero_left.get(symbol, ()):
+			if right in cell:
+				for output in parser.outputs.get((symbol, (zero_rule, right)), []):
+					families.append(PackedNode(output, (self.node(zero_rule, start, start), self.node(right, start, end))))
+
+		for left, zero_rule in parser.two_rules_zero_right.get(symbol, ()):
+			if left in cell:
+				for output in parser.outputs.get((symbol, (left, zero_rule)), []):
+					families.append(PackedNode(output, (self.node(left, start, end), self.node(zero_rule, end, end))))
+
+		return families
+
+	def count_derivations(self, node: SymbolNode[OutputT] | None = None) -> int:
+		"""
+		Returns the number of derivations of the node (by default, the root) without enumerating them.
+		A terminal has one derivation, and a custom rule or a nullable symbol has one derivation per value.
+		"""
+		node = node if node is not None else self.root
+		if node in self._counts:
+			return self._counts[node]
+
+		if node.is_terminal:
+			count = 1 if node.in_chart else 0
+
+		else:
+			count = 0
+			for family in node.families:
+				if family.values is not None:
+					count += len(family.values)
+
+				else:
+					product = 1
+					for child in family.children:
+						product *= self.count_derivations(child)
+
+					count += product
+
+		self._counts[node] = count
+		return count
+
+	def trees(self, node: SymbolNode[OutputT] | None = None) -> Iterator[ParseTree[OutputT]]:
+		"""
+		Yields the derivations of the node (by default, the root) one at a time.
+		Only the trees currently being built are kept in memory.
+		"""
+		node = node if node is not None else self.root
+		if node.is_terminal:
+			if node.in_chart:
+				yield ParseTree(node.symbol, node.start, node.end, None, ())
+
+			return
+
+		for family in node.families:
+			if family.values is not None:
+				for value in family.values:
+					yield ParseTree(node.symbol, node.start, node.end, None, (), value)
+
+			elif len(family.children) == 1:
+				for child in self.trees(family.children[0]):
+					yield ParseTree(node.symbol, node.start, node.end, family.output, (child,))
+
+			else:
+				left, right = family.children
+				for left_tree in self.trees(left):
+					for right_tree in self.trees(right):
+						yield ParseTree(node.symbol, node.start, node.end, family.output, (left_tree, right_tree))
+
+	def evaluate(self, node: SymbolNode[OutputT] | None = None) -> frozenset[OutputT] | None:
+		return (node if node is not None else self.root).evaluate()
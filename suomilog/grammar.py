@@ -14,9 +14,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import re
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import AbstractSet, Callable, Mapping, Self, Sequence
+from typing import AbstractSet, Callable, Iterable, Iterator, Mapping, NamedTuple, Self, Sequence
 
 
 def match_bits(tbits: AbstractSet[str], bits: AbstractSet[str]):
@@ -161,27 +163,139 @@ class Output[OutputT](ABC):
 		"""
 		...
 
+	def is_identity(self) -> bool:
+		"""
+		Returns true if the output of a rule with one nonterminal is always the output of that nonterminal unchanged.
+		Such rules can be removed by the grammar optimizer.
+		"""
+		return False
+
+
+class TemplateOp(NamedTuple):
+	"""
+	An operation of a compiled output template: a literal or an argument slot.
+	"""
+
+	literal: str | None
+	"""
+	The literal text, or None if this operation is an argument slot.
+	"""
+
+	arg: int = 0
+	"""
+	The index of the argument of an argument slot.
+	"""
+
+	bits: frozenset[str] = frozenset({"$"})
+	"""
+	The bits annotated to the word (`$1{+gen}` or `kissa{+pl}`). The default `{$}` passes the bits of the argument through.
+	"""
+
+	annotation: str = ""
+	"""
+	Free-form information for the subclass, such as an inflection mode.
+	"""
+
+	rest: bool = False
+	"""
+	If true, the slot takes all arguments starting from `arg`.
+	"""
+
+
+class TemplateOutput[OutputT](Output[OutputT]):
+	"""
+	A base class for outputs whose output code is a template of literals and variables $1, $2, and so on.
+
+	The code is compiled once, when the grammar is loaded, into a list of `TemplateOp`s,
+	so that `eval` only needs to assemble the result from the operations.
+	"""
+
+	def __init__(self, code: str):
+		self.code = code
+		self.ops = self.compile(code)
+
+	@abstractmethod
+	def compile(self, code: str) -> list[TemplateOp]:
+		...
+
+	@staticmethod
+	def compile_word(word: str, annotation: str = "") -> TemplateOp:
+		"""
+		Compiles a word of the form `token`, `token{bits}`, `$n` or `$n{bits}`.
+		"""
+		if "{" in word and word.endswith("}"):
+			i = word.index("{")
+			bits = frozenset(word[i+1:-1].split(","))
+			word = word[:i]
+
+		else:
+			bits = frozenset({"$"})
+
+		if not word.startswith("$"):
+			return TemplateOp(word, 0, bits, annotation)
 
-class StringOutput(Output[str]):
+		if not word[1:].isdigit() or int(word[1:]) < 1:
+			raise ValueError(f"Invalid variable in output code: {word}")
+
+		return TemplateOp(None, int(word[1:]) - 1, bits, annotation)
+
+
+class StringOutput(TemplateOutput[str]):
 	"""
 	A simple output method that treats the output code as a template string and subtitutes variables $1, $2, and so on with the outputs of the first nonterminal, the second nonterminal, and so on.
+	Variables are single digits. `$*` is replaced with the comma-separated outputs starting from the first variable that does not appear in the template.
+	The outputs substituted into the template are not scanned for variables again.
 	"""
 	def __init__(self, string: str):
+		super().__init__(string)
 		self.string = string
 
 	def __repr__(self):
 		return "StringOutput(" + repr(self.string) + ")"
 
+	def compile(self, code: str) -> list[TemplateOp]:
+		parts = _STRING_TEMPLATE_VARIABLE.split(code)
+		variables = set(parts[1::2])
+		cutoff = next(i for i in range(10) if str(i+1) not in variables)
+
+		ops: list[TemplateOp] = []
+		for i, part in enumerate(parts):
+			if i % 2 == 0:
+				if part:
+					ops.append(TemplateOp(part))
+
+			elif part == "*":
+				ops.append(TemplateOp(None, cutoff, rest=True))
+
+			elif int(part) - 1 < cutoff:
+				ops.append(TemplateOp(None, int(part) - 1))
+
+			else:
+				# Muuttujia puuttuvan muuttujan jälkeen ei korvata
+				ops.append(TemplateOp("$" + part))
+
+		return ops
+
+	def is_identity(self) -> bool:
+		return self.ops == [TemplateOp(None, 0)]
+
 	def eval(self, args):
 		args = [arg.surfaceform if isinstance(arg, Token) else str(arg) for arg in args]
-		ans = self.string
-		for i, a in enumerate(args):
-			var = "$"+str(i+1)
-			if var not in ans:
-				ans = ans.replace("$*", ",".join(args[i:]))
-				break
-			ans = ans.replace(var, str(a))
-		return ans
+		ans = []
+		for op in self.ops:
+			if op.literal is not None:
+				ans.append(op.literal)
+
+			elif op.rest:
+				ans.append(",".join(args[op.arg:]) if op.arg < len(args) else "$*")
+
+			else:
+				ans.append(args[op.arg] if op.arg < len(args) else "$" + str(op.arg+1))
+
+		return "".join(ans)
+
+
+_STRING_TEMPLATE_VARIABLE = re.compile(r"\$([1-9*])")
 
 
 class Grammar[OutputT]:
@@ -216,67 +330,60 @@ class Grammar[OutputT]:
 				self.rules[nonterminal_name] = grammar.rules[nonterminal_name].copy()
 
 	def parse_grammar_line(self, line: str, output: Output[OutputT] | None = None, default_output: Callable[[str], Output[OutputT]] | None = StringOutput):
-		if debug_level >= 1:
-			print(line)
-
-		tokens = line.replace("\t", " ").split(" ")
-		if len(tokens) > 2 and tokens[0].startswith(".") and tokens[1] == "::=" and (output is not None or "->" in tokens):
-			end = tokens.index("->") if "->" in tokens else len(tokens)
-			nonterminal_name = tokens[0][1:]
-			bits = set()
-			if "{" in nonterminal_name and nonterminal_name[-1] == "}":
-				i = nonterminal_name.index("{")
-				bits = set(nonterminal_name[i+1:-1].split(","))
-				nonterminal_name = nonterminal_name[:i]
-
-			words: list[TerminalOrNonterminal] = []
-			for token in tokens[2:end]:
-				word = parse_word_in_grammar_line(token)
-				if not word:
-					continue
-					
-				words.append(word)
-
-			if nonterminal_name not in self.rules:
-				self.rules[nonterminal_name] = []
-
-			if "->" in tokens:
-				if output is not None or default_output is None:
-					raise ValueError("Grammar line must have exactly one Output object. Ensure that `output` is not set if the grammar line has output code after an arrow `->`. If output code is present, the `default_output` must not be None.")
-
-				output_code = " ".join(tokens[end+1:])
-				output = default_output(output_code)
-
-			assert output is not None
-			rule = ProductionRule(nonterminal_name, words, output, bits)
-			self.rules[nonterminal_name].append(rule)
-			return rule
-
-		else:
-			raise ValueError("Syntax error on line `" + line + "'")
+		rule = parse_grammar_line(line, output, default_output)
+		self.add_rule(rule)
+		return rule
 
 	def parse_variable_line(self, line: str):
-		if debug_level >= 1:
-			print(line)
+		bitset_name, bits = parse_variable_line(line)
+		self.add_variable(bitset_name, bits)
 
-		if debug_level >= 1:
-			print(line)
+	def add_rule(self, rule: "ProductionRule[OutputT]"):
+		if rule.nonterminal_name not in self.rules:
+			self.rules[rule.nonterminal_name] = []
 
-		tokens = line.replace("\t", " ").split(" ")
-		if len(tokens) == 3 and tokens[0].startswith("$") and tokens[1] == "=" and tokens[2].startswith("{") and tokens[2].endswith("}"):
-			bitset_name = tokens[0]
-			bits = set(tokens[2][1:-1].split(","))
-			bits = merge_bits(bits, set(), self.bitset_variables, allow_minus=False)
-			self.bitset_variables[bitset_name] = bits
+		self.rules[rule.nonterminal_name].append(rule)
 
-		else:
-			raise ValueError("Syntax error on line `" + line + "'")
+	def add_variable(self, bitset_name: str, bits: AbstractSet[str]):
+		self.bitset_variables[bitset_name] = merge_bits(bits, set(), self.bitset_variables, allow_minus=False)
+
+	def load(self, path: str, default_output: Callable[[str], Output[OutputT]] = StringOutput) -> Self:
+		"""
+		Loads a grammar file and adds its rules and bitset variables to this grammar.
+
+		A grammar file contains rule lines (`.A ::= b .C -> output`), variable lines (`$var = {bits}`) and include lines (`%include other.suomilog`).
+		Include paths are relative to the including file.
+		Lines starting with `#` and all other lines are comments.
+
+		Parsed rules are cached per file (at most `GRAMMAR_FILE_CACHE_SIZE` files), so loading an unchanged file again
+		with the same `default_output` does not reparse it. The cached `ProductionRule` and `Output` objects are shared by all grammars
+		that load the file, so they should not be modified.
+		"""
+		self._load_entries(_load_file(os.path.realpath(path), default_output, ()))
+		return self
+
+	def loads(self, text: str, default_output: Callable[[str], Output[OutputT]] = StringOutput, directory: str = ".") -> Self:
+		"""
+		Like `load`, but reads the grammar from a string. Include paths are relative to `directory`.
+		"""
+		entries = _parse_grammar_text(text, os.path.realpath(directory), default_output)
+		self._load_entries(_resolve_includes(entries, default_output, ()))
+		return self
+
+	def _load_entries(self, entries: "Iterable[ProductionRule[OutputT] | tuple[str, set[str]]]"):
+		for entry in entries:
+			if isinstance(entry, ProductionRule):
+				self.add_rule(entry)
+
+			else:
+				self.add_variable(*entry)
 
 	def expand_bits(self, nonterminal_name: str, bits: AbstractSet[str], extended: dict[str, list["BaseRule[OutputT]"]] | None = None) -> tuple[str, dict[str, list["BaseRule[OutputT]"]]]:
 		if nonterminal_name not in self.rules:
 			return nonterminal_name, {}
 
-		ans: dict[str, list[BaseRule[OutputT]]] = extended or {}
+		# Tyhjäkin sanakirja on kelvollinen, jotta usean juuren laajennukset voivat jakaa sen
+		ans: dict[str, list[BaseRule[OutputT]]] = extended if extended is not None else {}
 		name = "." + nonterminal_name + "{" + ",".join(sorted(bits)) + "}"
 		if name in ans:
 			return name, ans
@@ -311,8 +418,55 @@ def parse_word_in_grammar_line(token: str) -> BaseformTerminal | SurfaceformTerm
 		return SurfaceformTerminal(token, ignore_case)
 
 
+def parse_grammar_line[OutputT](line: str, output: Output[OutputT] | None = None, default_output: Callable[[str], Output[OutputT]] | None = StringOutput) -> "ProductionRule[OutputT]":
+	if debug_level >= 1:
+		print(line)
+
+	tokens = line.replace("\t", " ").split(" ")
+	if len(tokens) > 2 and tokens[0].startswith(".") and tokens[1] == "::=" and (output is not None or "->" in tokens):
+		end = tokens.index("->") if "->" in tokens else len(tokens)
+		nonterminal_name = tokens[0][1:]
+		bits = set()
+		if "{" in nonterminal_name and nonterminal_name[-1] == "}":
+			i = nonterminal_name.index("{")
+			bits = set(nonterminal_name[i+1:-1].split(","))
+			nonterminal_name = nonterminal_name[:i]
+
+		words: list[TerminalOrNonterminal] = []
+		for token in tokens[2:end]:
+			word = parse_word_in_grammar_line(token)
+			if not word:
+				continue
+
+			words.append(word)
+
+		if end < len(tokens):
+			if output is not None or default_output is None:
+				raise ValueError("Grammar line must have exactly one Output object. Ensure that `output` is not set if the grammar line has output code after an arrow `->`. If output code is present, the `default_output` must not be None.")
+
+			output_code = " ".join(tokens[end+1:])
+			output = default_output(output_code)
+
+		assert output is not None
+		return ProductionRule(nonterminal_name, words, output, bits)
+
+	else:
+		raise ValueError("Syntax error on line `" + line + "'")
+
+
+def parse_variable_line(line: str) -> tuple[str, set[str]]:
+	if debug_level >= 1:
+		print(line)
+
+	tokens = line.replace("\t", " ").split(" ")
+	if len(tokens) == 3 and tokens[0].startswith("$") and tokens[1] == "=" and tokens[2].startswith("{") and tokens[2].endswith("}"):
+		return tokens[0], set(tokens[2][1:-1].split(","))
+
+	else:
+		raise ValueError("Syntax error on line `" + line + "'")
+
+
 debug_level = 0
-indent = 0
 
 def set_debug_level(n: int):
 	global debug_level
@@ -370,11 +524,17 @@ class ProductionRule[OutputT](BaseRule[OutputT]):
 	When expanded, this rule can only be expanded if $ matches these bits.
 	"""
 
-	def __init__(self, nonterminal_name: str, words: Sequence[TerminalOrNonterminal], output: Output[OutputT], bits: set[str] = set()):
+	origin: "ProductionRule[OutputT]"
+	"""
+	The rule of the original grammar this rule was expanded from (or the rule itself if it was not expanded).
+	"""
+
+	def __init__(self, nonterminal_name: str, words: Sequence[TerminalOrNonterminal], output: Output[OutputT], bits: set[str] = set(), origin: "ProductionRule[OutputT] | None" = None):
 		self.nonterminal_name = nonterminal_name
 		self.words = words
 		self.output = output
 		self.bits = set(bits)
+		self.origin = origin if origin is not None else self
 		self.positive_bits = set(bit for bit in bits if not bit.startswith("!"))
 		self.negative_bits = set(bit[1:] for bit in bits if bit.startswith("!"))
 
@@ -395,7 +555,7 @@ class ProductionRule[OutputT](BaseRule[OutputT]):
 		positive_bits = set(bit for bit in bits if not bit.startswith("!"))
 		negative_bits = set(bit[1:] for bit in bits if bit.startswith("!"))
 		if not self.positive_bits <= positive_bits or self.negative_bits & positive_bits or self.positive_bits & negative_bits:
-			return ProductionRule(name, [BaseformTerminal("<FALSE>", {"!"})], self.output)
+			return ProductionRule(name, [BaseformTerminal("<FALSE>", {"!"})], self.output, origin=self.origin)
 		
 		ans = []
 		for word in self.words:
@@ -408,4 +568,68 @@ class ProductionRule[OutputT](BaseRule[OutputT]):
 			else:
 				ans.append(word.expand_bits(bits))
 		
-		return ProductionRule(name, ans, self.output)
\ No newline at end of file
+		return ProductionRule(name, ans, self.output, origin=self.origin)
+
+
+# Rules and bitset variable definitions in the order they appear in a grammar file
+type GrammarFileEntry = ProductionRule | tuple[str, set[str]] | GrammarInclude
+
+
+class GrammarInclude(NamedTuple):
+	path: str
+
+
+GRAMMAR_FILE_CACHE_SIZE = 256
+
+# Jäsennetyt tiedostot polun mukaan: muokkausaika, tulostefunktio ja rivit
+_file_cache: dict[str, tuple[int, Callable[[str], Output], list[GrammarFileEntry]]] = {}
+
+
+def _load_file(path: str, default_output: Callable[[str], Output], including: tuple[str, ...]) -> Iterator[ProductionRule | tuple[str, set[str]]]:
+	if path in including:
+		raise ValueError("Circular include: " + " -> ".join(including + (path,)))
+
+	mtime = os.stat(path).st_mtime_ns
+	if (cached := _file_cache.get(path)) and cached[0] == mtime and cached[1] == default_output:
+		entries = cached[2]
+
+	else:
+		with open(path) as file:
+			entries = _parse_grammar_text(file.read(), os.path.dirname(path), default_output)
+
+		# Jokaisella tiedostolla on yksi paikka, ja vanhimmat tiedostot poistetaan, kun välimuisti on täynnä
+		_file_cache.pop(path, None)
+		while len(_file_cache) >= GRAMMAR_FILE_CACHE_SIZE:
+			del _file_cache[next(iter(_file_cache))]
+
+		_file_cache[path] = (mtime, default_output, entries)
+
+	# Sisällytetyt tiedostot ratkaistaan vasta tässä, jotta niiden muutokset huomataan, vaikka sisällyttävä tiedosto ei olisi muuttunut
+	yield from _resolve_includes(entries, default_output, including + (path,))
+
+
+def _resolve_includes(entries: list[GrammarFileEntry], default_output: Callable[[str], Output], including: tuple[str, ...]) -> Iterator[ProductionRule | tuple[str, set[str]]]:
+	for entry in entries:
+		if isinstance(entry, GrammarInclude):
+			yield from _load_file(entry.path, default_output, including)
+
+		else:
+			yield entry
+
+
+def _parse_grammar_text(text: str, directory: str, default_output: Callable[[str], Output]) -> list[GrammarFileEntry]:
+	entries: list[GrammarFileEntry] = []
+	for line in text.splitlines():
+		if line.startswith("#"):
+			continue
+
+		elif "::=" in line:
+			entries.append(parse_grammar_line(line, default_output=default_output))
+
+		elif line.startswith("$"):
+			entries.append(parse_variable_line(line.strip()))
+
+		elif line.startswith("%include "):
+			entries.append(GrammarInclude(os.path.realpath(os.path.join(directory, line[len("%include "):].strip()))))
+
+	return entries
\ No newline at end of file
@@ -0,0 +1,174 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Precomputed, memory-mapped lexicons for a closed vocabulary.
+
+A lexicon is a sorted string table: the keys and values are stored as UTF-8 strings with offset arrays,
+and lookups are binary searches in the mapped file. The file uses the container format of `suomilog.sectionfile`.
+`suomilog.finnish` consults a loaded lexicon before falling back to pypykko.
+"""
+
+from array import array
+from collections import Counter
+from typing import Iterable
+from .sectionfile import SectionFile, write_section_file
+
+
+MAGIC = b"SUOMILEX"
+VERSION = 2
+
+KEY_OFFSETS, KEY_BYTES, VALUE_OFFSETS, VALUE_BYTES = range(4)
+
+SECTION_COUNT = 4
+
+INFLECTION_KIND = b"INFL"
+ANALYSIS_KIND = b"ANAL"
+
+# Avaimen kentät ja arvon vaihtoehdot erotetaan merkeillä, joita ei esiinny sanoissa
+FIELD_SEPARATOR = "\t"
+ITEM_SEPARATOR = "\n"
+
+
+def write_string_table(path: str, kind: bytes, items: Iterable[tuple[str, str]]):
+	"""
+	Writes a sorted string table. If a key occurs many times, the last value is used.
+	"""
+	table = {key.encode("utf-8"): value.encode("utf-8") for key, value in items}
+	keys = sorted(table)
+
+	sections: list[bytes] = []
+	for strings in (keys, [table[key] for key in keys]):
+		offsets = array("q", [0])
+		for string in strings:
+			offsets.append(offsets[-1] + len(string))
+
+		sections += [offsets.tobytes(), b"".join(strings)]
+
+	write_section_file(path, MAGIC, VERSION, kind, sections)
+
+
+class StringTable(SectionFile):
+	"""
+	A read-only view of a file written by `write_string_table`.
+	"""
+
+	def __init__(self, path: str, kind: bytes):
+		super().__init__(path, MAGIC, VERSION, kind, SECTION_COUNT, f"suomilog {kind.decode()} lexicon", {KEY_OFFSETS: "q", VALUE_OFFSETS: "q"})
+
+	def __len__(self) -> int:
+		return len(self._sections[KEY_OFFSETS]) - 1
+
+	def _key(self, i: int) -> bytes:
+		offsets = self._sections[KEY_OFFSETS]
+		return bytes(self._sections[KEY_BYTES][offsets[i]:offsets[i+1]])
+
+	def get(self, key: str) -> str | None:
+		encoded = key.encode("utf-8")
+		lo, hi = 0, len(self)
+		while lo < hi:
+			mid = (lo + hi) // 2
+			if self._key(mid) < encoded:
+				lo = mid + 1
+
+			else:
+				hi = mid
+
+		if lo == len(self) or self._key(lo) != encoded:
+			return None
+
+		offsets = self._sections[VALUE_OFFSETS]
+		return bytes(self._sections[VALUE_BYTES][offsets[lo]:offsets[lo+1]]).decode("utf-8")
+
+
+class InflectionLexicon(StringTable):
+	"""
+	Precomputed results of `finnish.inflect_nominal`, written by `write_inflection_lexicon`.
+	"""
+
+	def __init__(self, path: str):
+		super().__init__(path, INFLECTION_KIND)
+
+	def lookup(self, word: str, plural_tag: str, case_tag: str, poss_tag: str = "") -> list[str] | None:
+		"""
+		Returns the inflected forms, or None if the lexicon does not contain the word in this form.
+		"""
+		value = self.get(FIELD_SEPARATOR.join((word, plural_tag, case_tag, poss_tag)))
+		if value is None:
+			return None
+
+		return value.split(ITEM_SEPARATOR) if value else []
+
+
+class AnalysisLexicon(StringTable):
+	"""
+	Precomputed morphological analyses of surface forms, written by `write_analysis_lexicon`.
+	"""
+
+	def __init__(self, path: str):
+		super().__init__(path, ANALYSIS_KIND)
+
+	def lookup(self, word: str) -> list[tuple[str, set[str]]] | None:
+		"""
+		Returns the (baseform, bits) alternatives of the word as given by `finnish.baseformAndBits`,
+		or None if the lexicon does not contain the word.
+		"""
+		value = self.get(word)
+		if value is None:
+			return None
+
+		alternatives = []
+		for analysis in value.split(ITEM_SEPARATOR) if value else []:
+			baseform, *bits = analysis.split(FIELD_SEPARATOR)
+			alternatives.append((baseform, set(bits)))
+
+		return alternatives
+
+
+def write_inflection_lexicon(path: str, words: Iterable[str], tags: Iterable[tuple[str, str, str]] | None = None, processes: int = 0):
+	"""
+	Inflects the words to the given (number, case, possessive) forms with `finnish.inflect_nominals` and writes the results to a lexicon.
+	By default, the words are inflected to the full paradigm.
+	"""
+	from . import finnish
+	tags = list(tags) if tags is not None else finnish.paradigm_tags()
+	requests = [(word, *tag) for word in dict.fromkeys(words) for tag in tags]
+	results = finnish.inflect_nominals(requests, processes=processes)
+	write_string_table(path, INFLECTION_KIND, (
+		(FIELD_SEPARATOR.join(request), ITEM_SEPARATOR.join(forms))
+		for request, forms in zip(requests, results)
+	))
+
+
+def write_analysis_lexicon(path: str, texts: Iterable[str], min_count: int = 1):
+	"""
+	Tokenizes the texts, analyzes every word that occurs at least `min_count` times with pypykko and writes the analyses to a lexicon.
+	"""
+	from . import finnish
+	counts: Counter[str] = Counter()
+	for text in texts:
+		for token in finnish._merge_quotes(finnish.pykko_tokenize(text)):
+			word, _ = finnish._strip_token(token)
+			if word.strip() != "":
+				counts[word] += 1
+
+	def analyses(word: str) -> str:
+		return ITEM_SEPARATOR.join(
+			FIELD_SEPARATOR.join([baseform, *sorted(bits)])
+			for baseform, bits in map(finnish.baseformAndBits, finnish.pykko.analyze(word))
+		)
+
+	write_string_table(path, ANALYSIS_KIND, ((word, analyses(word)) for word, count in counts.items() if count >= min_count))
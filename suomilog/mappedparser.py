@@ -0,0 +1,563 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A flat, read-only binary format for compiled grammars.
+
+`write_compiled_grammar` stores the tables of a `CYKParser` as arrays of 32-bit integers.
+`MappedCYKParser` maps such a file into memory with `mmap` and parses directly against it,
+so that all processes using the same file share one copy of the tables through the page cache.
+
+Symbols are stored as a sorted string table and referred to by their index.
+The unary closure (`one_rules_expanded`), the binary rules and the outputs are stored in CSR form
+(an index pointer array and an index array).
+Python objects that cannot be flattened (terminals, custom rules, `Output` objects and the grammar itself) are pickled into a small trailing section.
+Their number is proportional to the size of the source grammar, not the expanded grammar.
+The sections are stored in the container format of `suomilog.sectionfile`.
+"""
+
+import pickle
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import AbstractSet, Hashable, Iterable, Iterator, Sequence
+from . import grammar
+from .cykparser import _ParseGuard, crosses_constraint, is_helper_symbol, splits_constituent, CYKAnalysis, CYKParser, CYKTable, ParseBudget, DenormalizeChainOutput, DenormalizeEndOutput, DenormalizeStartOutput, NormalizedOutput, SplitTable, TokenOutputTable
+from .sectionfile import SectionFile, write_section_file
+
+
+MAGIC = b"SUOMILOG"
+VERSION = 2
+KIND = b"CYKG"
+
+(
+	SYMBOL_OFFSETS,
+	SYMBOL_BYTES,
+	TOKEN_SYMBOLS,
+	CUSTOM_SYMBOLS,
+	UNARY_INDPTR,
+	UNARY_INDICES,
+	BINARY_LEFT_INDPTR,
+	BINARY_RIGHT,
+	BINARY_INDPTR,
+	BINARY_INDICES,
+	ZERO_LEFT_INDPTR,
+	ZERO_LEFT_PAIRS,
+	ZERO_RIGHT_INDPTR,
+	ZERO_RIGHT_PAIRS,
+	OUTPUT_KEYS,
+	OUTPUT_INDPTR,
+	OUTPUT_OPS,
+	OBJECTS,
+) = range(18)
+
+SECTION_COUNT = 18
+
+# Output operations are stored as four integers: kind, flag, flag, object index
+OP_OUTPUT = 0
+OP_START = 1
+OP_CHAIN = 2
+OP_END = 3
+
+
+def write_compiled_grammar(parser: CYKParser, path: str):
+	"""
+	Writes the tables of a compiled parser to a file that can be opened with `MappedCYKParser`.
+
+	The outputs and custom rules of the grammar must be picklable.
+	"""
+	symbol_set: set[str] = set()
+	symbol_set |= parser.token_rules.keys()
+	symbol_set |= parser.custom_rules.keys()
+	symbol_set |= parser.zero_rules
+	for a, B in parser.one_rules_expanded.items():
+		if B:
+			symbol_set.add(a)
+			symbol_set |= B
+
+	for (a, b), C in parser.two_rules.items():
+		if C:
+			symbol_set |= {a, b}
+			symbol_set |= C
+
+	for (a, rhs), outputs in parser.outputs.items():
+		if outputs:
+			symbol_set.add(a)
+			symbol_set |= {rhs} if isinstance(rhs, str) else set(rhs)
+
+	symbols = sorted(symbol_set, key=lambda s: s.encode("utf-8"))
+	ids = {symbol: i for i, symbol in enumerate(symbols)}
+	n = len(symbols)
+
+	sections: list[bytes] = [b""] * SECTION_COUNT
+
+	encoded = [symbol.encode("utf-8") for symbol in symbols]
+	offsets = array("i", [0])
+	for e in encoded:
+		offsets.append(offsets[-1] + len(e))
+
+	sections[SYMBOL_OFFSETS] = offsets.tobytes()
+	sections[SYMBOL_BYTES] = b"".join(encoded)
+
+	token_names = sorted(parser.token_rules, key=ids.__getitem__)
+	custom_names = sorted(parser.custom_rules, key=ids.__getitem__)
+	sections[TOKEN_SYMBOLS] = array("i", [ids[name] for name in token_names]).tobytes()
+	sections[CUSTOM_SYMBOLS] = array("i", [ids[name] for name in custom_names]).tobytes()
+
+	def csr(rows: dict[int, list[int]], width: int = 1) -> tuple[bytes, bytes]:
+		indptr = array("i", [0])
+		indices = array("i")
+		for i in range(n):
+			row = rows.get(i, [])
+			indices.extend(row)
+			indptr.append(len(indices) // width)
+
+		return indptr.tobytes(), indices.tobytes()
+
+	unary = {ids[a]: sorted(ids[b] for b in B) for a, B in parser.one_rules_expanded.items() if B}
+	sections[UNARY_INDPTR], sections[UNARY_INDICES] = csr(unary)
+
+	pairs = sorted((ids[a], ids[b], sorted(ids[c] for c in C)) for (a, b), C in parser.two_rules.items() if C)
+	left_rows: dict[int, list[int]] = defaultdict(list)
+	binary_indptr = array("i", [0])
+	binary_indices = array("i")
+	for a, b, C in pairs:
+		left_rows[a].append(b)
+		binary_indices.extend(C)
+		binary_indptr.append(len(binary_indices))
+
+	left_indptr = array("i", [0])
+	for i in range(n):
+		left_indptr.append(left_indptr[-1] + len(left_rows.get(i, [])))
+
+	sections[BINARY_LEFT_INDPTR] = left_indptr.tobytes()
+	sections[BINARY_RIGHT] = array("i", [b for _, b, _ in pairs]).tobytes()
+	sections[BINARY_INDPTR] = binary_indptr.tobytes()
+	sections[BINARY_INDICES] = binary_indices.tobytes()
+
+	zero_left = {ids[a]: [ids[x] for pair in sorted(B) for x in pair] for a, B in parser.two_rules_zero_left.items() if B}
+	sections[ZERO_LEFT_INDPTR], sections[ZERO_LEFT_PAIRS] = csr(zero_left, 2)
+	zero_right = {ids[a]: [ids[x] for pair in sorted(B) for x in pair] for a, B in parser.two_rules_zero_right.items() if B}
+	sections[ZERO_RIGHT_INDPTR], sections[ZERO_RIGHT_PAIRS] = csr(zero_right, 2)
+
+	objects: list[grammar.Output] = []
+	object_ids: dict[int, int] = {}
+
+	def object_index(output: grammar.Output) -> int:
+		if id(output) not in object_ids:
+			object_ids[id(output)] = len(objects)
+			objects.append(output)
+
+		return object_ids[id(output)]
+
+	def encode_op(output: NormalizedOutput) -> tuple[int, int, int, int]:
+		if isinstance(output, DenormalizeStartOutput):
+			return OP_START, output.a_is_nonterminal, output.b_is_nonterminal, -1
+
+		elif isinstance(output, DenormalizeChainOutput):
+			return OP_CHAIN, output.a_is_nonterminal, 0, -1
+
+		elif isinstance(output, DenormalizeEndOutput):
+			return OP_END, output.a_is_nonterminal, 0, object_index(output.output)
+
+		else:
+			return OP_OUTPUT, 0, 0, object_index(output)
+
+	output_keys = array("i")
+	output_indptr = array("i", [0])
+	output_ops = array("i")
+	keyed = []
+	for (a, rhs), outputs in parser.outputs.items():
+		if outputs:
+			key = (ids[a], ids[rhs], -1) if isinstance(rhs, str) else (ids[a], ids[rhs[0]], ids[rhs[1]])
+			keyed.append((key, outputs))
+
+	for key, outputs in sorted(keyed, key=lambda i: i[0]):
+		output_keys.extend(key)
+		for output in outputs:
+			output_ops.extend(encode_op(output))
+
+		output_indptr.append(len(output_ops) // 4)
+
+	sections[OUTPUT_KEYS] = output_keys.tobytes()
+	sections[OUTPUT_INDPTR] = output_indptr.tobytes()
+	sections[OUTPUT_OPS] = output_ops.tobytes()
+
+	sections[OBJECTS] = pickle.dumps({
+		"grammar": parser.grammar,
+		"terminals": [parser.token_rules[name] for name in token_names],
+		"custom_rules": [parser.custom_rules[name] for name in custom_names],
+		"zero_outputs": parser.zero_outputs,
+		"outputs": objects,
+	})
+
+	write_section_file(path, MAGIC, VERSION, KIND, sections)
+
+
+class MappedCYKParser[OutputT](SectionFile):
+	"""
+	A parser that runs directly against a compiled grammar file written by `write_compiled_grammar`.
+
+	The integer tables are never copied to the Python heap: lookups are done with binary searches in the mapped file.
+	The analyses it returns are ordinary `CYKAnalysis` objects. Their `cyk_parser` is a view of this parser
+	that caches the lookups of the analysis (`_MappedAnalysisTables`).
+	"""
+
+	def __init__(self, path: str):
+		super().__init__(path, MAGIC, VERSION, KIND, SECTION_COUNT, "compiled suomilog grammar", {i: "i" for i in range(SECTION_COUNT) if i not in (SYMBOL_BYTES, OBJECTS)})
+
+		objects = pickle.loads(self._sections[OBJECTS])
+		self.grammar: grammar.Grammar[OutputT] = objects["grammar"]
+		self.zero_outputs: dict[str, frozenset[OutputT]] = objects["zero_outputs"]
+		self.zero_rules = set(self.zero_outputs)
+		self._output_objects: list[grammar.Output[OutputT]] = objects["outputs"]
+		self._terminals: list[tuple[int, grammar.Terminal]] = list(zip(self._sections[TOKEN_SYMBOLS], objects["terminals"]))
+		self._custom_rules: list[tuple[int, grammar.BaseRule[OutputT]]] = list(zip(self._sections[CUSTOM_SYMBOLS], objects["custom_rules"]))
+
+		self.outputs = _MappedOutputs(self)
+		self.two_rules_zero_left = _MappedZeroRules(self, ZERO_LEFT_INDPTR, ZERO_LEFT_PAIRS)
+		self.two_rules_zero_right = _MappedZeroRules(self, ZERO_RIGHT_INDPTR, ZERO_RIGHT_PAIRS)
+
+	@property
+	def symbol_count(self) -> int:
+		return len(self._sections[SYMBOL_OFFSETS]) - 1
+
+	def symbol_name(self, symbol: int) -> str:
+		offsets = self._sections[SYMBOL_OFFSETS]
+		return bytes(self._sections[SYMBOL_BYTES][offsets[symbol]:offsets[symbol+1]]).decode("utf-8")
+
+	def symbol_id(self, name: str) -> int | None:
+		"""
+		Returns the index of the symbol in the string table, or None if the grammar does not contain it.
+		"""
+		key = name.encode("utf-8")
+		offsets = self._sections[SYMBOL_OFFSETS]
+		data = self._sections[SYMBOL_BYTES]
+		lo, hi = 0, self.symbol_count
+		while lo < hi:
+			mid = (lo + hi) // 2
+			if bytes(data[offsets[mid]:offsets[mid+1]]) < key:
+				lo = mid + 1
+
+			else:
+				hi = mid
+
+		if lo < self.symbol_count and bytes(data[offsets[lo]:offsets[lo+1]]) == key:
+			return lo
+
+		return None
+
+	def _row(self, indptr: int, indices: int, symbol: int) -> memoryview:
+		ptr = self._sections[indptr]
+		return self._sections[indices][ptr[symbol]:ptr[symbol+1]]
+
+	def _binary_parents(self, a: int, b: int) -> memoryview | None:
+		left_indptr = self._sections[BINARY_LEFT_INDPTR]
+		lo, hi = left_indptr[a], left_indptr[a+1]
+		if lo == hi:
+			return None
+
+		right = self._sections[BINARY_RIGHT]
+		i = bisect_left(right, b, lo, hi)
+		if i == hi or right[i] != b:
+			return None
+
+		return self._row(BINARY_INDPTR, BINARY_INDICES, i)
+
+	def _output_ops(self, key: tuple[int, int, int]) -> Iterator[tuple[int, int, int, int]]:
+		keys = self._sections[OUTPUT_KEYS]
+		lo, hi = 0, len(keys) // 3
+		while lo < hi:
+			mid = (lo + hi) // 2
+			if (keys[3*mid], keys[3*mid+1], keys[3*mid+2]) < key:
+				lo = mid + 1
+
+			else:
+				hi = mid
+
+		if lo == len(keys) // 3 or (keys[3*lo], keys[3*lo+1], keys[3*lo+2]) != key:
+			return
+
+		yield from self._output_ops_at(lo)
+
+	def _output_ops_at(self, index: int) -> Iterator[tuple[int, int, int, int]]:
+		indptr = self._sections[OUTPUT_INDPTR]
+		ops = self._sections[OUTPUT_OPS]
+		for i in range(indptr[index], indptr[index+1]):
+			yield ops[4*i], ops[4*i+1], ops[4*i+2], ops[4*i+3]
+
+	def _output_row(self, lhs: int) -> dict[tuple[int, int], int]:
+		"""
+		Returns the right sides of the outputs of `lhs` and their indices in the output table.
+		"""
+		keys = self._sections[OUTPUT_KEYS]
+		lo, hi = 0, len(keys) // 3
+		while lo < hi:
+			mid = (lo + hi) // 2
+			if keys[3*mid] < lhs:
+				lo = mid + 1
+
+			else:
+				hi = mid
+
+		row: dict[tuple[int, int], int] = {}
+		for i in range(lo, len(keys) // 3):
+			if keys[3*i] != lhs:
+				break
+
+			row[keys[3*i+1], keys[3*i+2]] = i
+
+		return row
+
+	def _decode_op(self, op: tuple[int, int, int, int]) -> NormalizedOutput[OutputT]:
+		kind, a, b, obj = op
+		if kind == OP_START:
+			return DenormalizeStartOutput(bool(a), bool(b))
+
+		elif kind == OP_CHAIN:
+			return DenormalizeChainOutput(bool(a))
+
+		elif kind == OP_END:
+			return DenormalizeEndOutput(bool(a), self._output_objects[obj])
+
+		else:
+			return self._output_objects[obj]
+
+	def parse(self, tokens: list[grammar.Token], cancel: threading.Event | None = None, budget: ParseBudget | None = None, max_span: int | None = None, constraints: Iterable[tuple[int, int]] | None = None, constituents: Iterable[tuple[int, int]] | None = None) -> CYKAnalysis[OutputT]:
+		guard = _ParseGuard(cancel, budget) if cancel is not None or budget is not None else None
+		if guard is not None:
+			guard.check_tokens(tokens)
+
+		chart: defaultdict[tuple[int, int], set[int]] = defaultdict(set)
+		splits: defaultdict[tuple[int, int, int], set[int]] = defaultdict(set)
+		token_outputs: TokenOutputTable = defaultdict(set)
+
+		def add(cell: set[int], symbol: int):
+			cell.add(symbol)
+			cell.update(self._row(UNARY_INDPTR, UNARY_INDICES, symbol))
+
+		helpers: dict[int, bool] = {}
+
+		def is_helper(symbol: int) -> bool:
+			if symbol not in helpers:
+				helpers[symbol] = is_helper_symbol(self.symbol_name(symbol))
+
+			return helpers[symbol]
+
+		zero_symbols = [symbol for name in self.zero_rules if (symbol := self.symbol_id(name)) is not None]
+
+		def add_helper(cell: set[int], helper: int):
+			# Sama kuin CYKParser._helper_closure
+			queue = [helper]
+			cell.add(helper)
+			while queue:
+				symbol = queue.pop()
+				for zero_symbol in zero_symbols:
+					for rule in self._binary_parents(zero_symbol, symbol) or ():
+						if is_helper(rule) and rule not in cell:
+							cell.add(rule)
+							queue.append(rule)
+
+		def match_custom_rules(start: int, end: int):
+			for symbol, custom_rule in self._custom_rules:
+				if token_output := custom_rule.match(self.grammar, tokens[start:end], set()):
+					if not all(isinstance(t, Hashable) for t in token_output):
+						raise ValueError(f"Output of {self.symbol_name(symbol)} for {tokens[start:end]} is not hashable: {token_output}")
+					add(chart[(start, end)], symbol)
+					token_outputs[(start, end, self.symbol_name(symbol))] |= set(token_output)
+
+		for i in range(len(tokens)):
+			for symbol, terminal in self._terminals:
+				if terminal.matches_token(tokens[i]):
+					add(chart[(i, i+1)], symbol)
+
+			match_custom_rules(i, i+1)
+			if guard is not None:
+				guard.add_chart_items(len(chart[(i, i+1)]))
+
+		constraints = [(bs, be) for bs, be in constraints if be - bs >= 2] if constraints is not None else []
+		constituents = frozenset((bs, be) for bs, be in constituents if be - bs >= 2) if constituents is not None else frozenset()
+		longest_span = min(len(tokens), max_span) if max_span is not None else len(tokens)
+		for span in range(2, longest_span+1):
+			for start in range(len(tokens)-span+1):
+				if guard is not None:
+					guard.check()
+
+				end = start + span
+				if constituents and crosses_constraint(start, end, constituents):
+					continue
+
+				helpers_only = bool(constraints) and crosses_constraint(start, end, constraints)
+				for split in range(start+1, end):
+					right = chart[(split, end)]
+					if constituents:
+						if splits_constituent(start, split, end, constituents):
+							continue
+
+						if (split, end) in constituents:
+							right = {symbol for symbol in right if not is_helper(symbol)}
+
+					for rule1 in chart[(start, split)]:
+						for rule2 in right:
+							if (parents := self._binary_parents(rule1, rule2)) is None:
+								continue
+
+							for rule in parents:
+								if helpers_only:
+									if is_helper(rule):
+										add_helper(chart[(start, end)], rule)
+										splits[(start, end, rule)].add(split)
+
+									continue
+
+								add(chart[(start, end)], rule)
+								splits[(start, end, rule)].add(split)
+
+				if not helpers_only:
+					match_custom_rules(start, end)
+
+				if guard is not None:
+					guard.add_chart_items(len(chart[(start, end)]))
+
+		# Analyysi käsittelee symboleita niiden niminä, joten muunnetaan taulukot merkkijonoiksi
+		names: dict[int, str] = {}
+
+		def name(symbol: int) -> str:
+			if symbol not in names:
+				names[symbol] = self.symbol_name(symbol)
+
+			return names[symbol]
+
+		cyk_table: CYKTable = defaultdict(set)
+		for cell, symbols in chart.items():
+			cyk_table[cell] = {name(symbol) for symbol in symbols}
+
+		split_table: SplitTable = defaultdict(set)
+		for (start, end, symbol), split_points in splits.items():
+			split_table[(start, end, name(symbol))] = split_points
+
+		tables = _MappedAnalysisTables(self, {symbol_name: symbol for symbol, symbol_name in names.items()})
+		return CYKAnalysis(tables, tokens, cyk_table, split_table, token_outputs, guard, constituents=constituents)  # type: ignore
+
+
+class _MappedOutputs[OutputT]:
+	"""
+	A read-only view with the same lookup interface as `CYKParser.outputs`.
+
+	If `symbol_ids` is given, it is used as a cache of symbol ids, and the decoded outputs are cached as well.
+	"""
+	def __init__(self, parser: MappedCYKParser[OutputT], symbol_ids: dict[str, int | None] | None = None):
+		self.parser = parser
+		self.symbol_ids = symbol_ids
+		self._cache: dict[tuple[str, str | tuple[str, str]], list[NormalizedOutput[OutputT]]] | None = {} if symbol_ids is not None else None
+		self._rows: dict[str, dict[tuple[int, int], int]] = {}
+
+	def get(self, key: tuple[str, str | tuple[str, str]], default: Sequence[NormalizedOutput[OutputT]] = ()) -> Sequence[NormalizedOutput[OutputT]]:
+		if self._cache is None:
+			lhs, rhs = key
+			symbols = [lhs] + ([rhs] if isinstance(rhs, str) else list(rhs))
+			ids = [self.parser.symbol_id(symbol) for symbol in symbols]
+			if any(i is None for i in ids):
+				return default
+
+			return [self.parser._decode_op(op) for op in self.parser._output_ops((ids[0], ids[1], ids[2] if len(ids) == 3 else -1))] or default  # type: ignore
+
+		if (outputs := self._cache.get(key)) is None:
+			outputs = self._cache[key] = self._lookup(key)
+
+		return outputs or default
+
+	def _lookup(self, key: tuple[str, str | tuple[str, str]]) -> list[NormalizedOutput[OutputT]]:
+		lhs, rhs = key
+
+		# Useimmat haut eivät löydä mitään, joten vasemman puolen säännöt luetaan kerralla sanakirjaan
+		if (row := self._rows.get(lhs)) is None:
+			lhs_id = _symbol_id(self.parser, self.symbol_ids, lhs)
+			row = self._rows[lhs] = self.parser._output_row(lhs_id) if lhs_id is not None else {}
+
+		if isinstance(rhs, str):
+			index = row.get((_symbol_id(self.parser, self.symbol_ids, rhs), -1))  # type: ignore
+
+		else:
+			index = row.get((_symbol_id(self.parser, self.symbol_ids, rhs[0]), _symbol_id(self.parser, self.symbol_ids, rhs[1])))  # type: ignore
+
+		return [self.parser._decode_op(op) for op in self.parser._output_ops_at(index)] if index is not None else []
+
+	def __getitem__(self, key: tuple[str, str | tuple[str, str]]) -> Sequence[NormalizedOutput[OutputT]]:
+		return self.get(key, [])
+
+
+class _MappedZeroRules:
+	"""
+	A read-only view with the same lookup interface as `CYKParser.two_rules_zero_left` and `two_rules_zero_right`.
+
+	If `symbol_ids` is given, it is used as a cache of symbol ids, and the decoded rows are cached as well.
+	"""
+	def __init__(self, parser: MappedCYKParser, indptr: int, pairs: int, symbol_ids: dict[str, int | None] | None = None):
+		self.parser = parser
+		self.indptr = indptr
+		self.pairs = pairs
+		self.symbol_ids = symbol_ids
+		self._cache: dict[str, set[tuple[str, str]]] | None = {} if symbol_ids is not None else None
+
+	def get(self, name: str, default: AbstractSet[tuple[str, str]] = frozenset()) -> AbstractSet[tuple[str, str]]:
+		return self[name] or default
+
+	def __getitem__(self, name: str) -> set[tuple[str, str]]:
+		if self._cache is not None and (pairs := self._cache.get(name)) is not None:
+			return pairs
+
+		symbol = _symbol_id(self.parser, self.symbol_ids, name)
+		if symbol is None:
+			pairs = set()
+
+		else:
+			ptr = self.parser._sections[self.indptr]
+			row = self.parser._sections[self.pairs][2*ptr[symbol]:2*ptr[symbol+1]]
+			pairs = {(self.parser.symbol_name(row[i]), self.parser.symbol_name(row[i+1])) for i in range(0, len(row), 2)}
+
+		if self._cache is not None:
+			self._cache[name] = pairs
+
+		return pairs
+
+
+class _MappedAnalysisTables[OutputT]:
+	"""
+	The tables of a `MappedCYKParser` as seen by one `CYKAnalysis`.
+
+	Output extraction looks up the same symbols and rules many times, so the symbol ids and the decoded outputs are cached here.
+	The caches belong to the analysis, so the parser itself is not modified and can still be shared between threads.
+	"""
+	def __init__(self, parser: MappedCYKParser[OutputT], symbol_ids: dict[str, int | None]):
+		self.parser = parser
+		self.outputs = _MappedOutputs(parser, symbol_ids)
+		self.two_rules_zero_left = _MappedZeroRules(parser, ZERO_LEFT_INDPTR, ZERO_LEFT_PAIRS, symbol_ids)
+		self.two_rules_zero_right = _MappedZeroRules(parser, ZERO_RIGHT_INDPTR, ZERO_RIGHT_PAIRS, symbol_ids)
+
+	def __getattr__(self, name: str):
+		return getattr(self.parser, name)
+
+
+def _symbol_id(parser: MappedCYKParser, symbol_ids: dict[str, int | None] | None, name: str) -> int | None:
+	if symbol_ids is None:
+		return parser.symbol_id(name)
+
+	if name not in symbol_ids:
+		symbol_ids[name] = parser.symbol_id(name)
+
+	return symbol_ids[name]
@@ -0,0 +1,168 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+An optimization pass for expanded grammars, run before they are converted to Chomsky normal form.
+
+The pass removes
+ - rules whose bit constraints cannot be satisfied (`expand_bits` turns them into `<FALSE>{!}` rules),
+ - rules that refer to nonterminals that cannot derive anything,
+ - nonterminals that cannot be reached from the roots,
+and folds nonterminals that have only one rule whose output passes its only nonterminal through unchanged (`Output.is_identity`).
+Rules whose nonterminal can match the empty string (a custom rule with `allows_empty_content`) are not folded,
+because the parser does not derive the empty string through unary rules, and folding would add such derivations.
+The outputs of the roots do not change, but the folded and removed nonterminals are not in the chart.
+"""
+
+from dataclasses import dataclass, field
+from typing import Iterable
+from . import grammar
+
+
+type ExpandedGrammar[OutputT] = dict[str, list[grammar.BaseRule[OutputT]]]
+
+
+@dataclass
+class OptimizationReport:
+	rules_before: int = 0
+	rules_after: int = 0
+	contradictory_rules: int = 0
+	unproductive_nonterminals: list[str] = field(default_factory=list)
+	unreachable_nonterminals: list[str] = field(default_factory=list)
+	folded_nonterminals: dict[str, str] = field(default_factory=dict)
+	"""
+	A mapping from the folded nonterminals to the nonterminals that replaced them.
+	"""
+
+	def print(self):
+		print(f"Rules: {self.rules_before} -> {self.rules_after}")
+		print(f"Contradictory rules removed: {self.contradictory_rules}")
+		print(f"Unproductive nonterminals removed: {len(self.unproductive_nonterminals)}")
+		print(f"Unreachable nonterminals removed: {len(self.unreachable_nonterminals)}")
+		print(f"Unary nonterminals folded: {len(self.folded_nonterminals)}")
+
+
+def optimize_grammar[OutputT](expanded: ExpandedGrammar[OutputT], roots: Iterable[str]) -> tuple[ExpandedGrammar[OutputT], OptimizationReport]:
+	"""
+	Returns an optimized copy of an expanded grammar (as returned by `Grammar.expand_bits`) and a report of what was removed.
+	"""
+	roots = set(roots)
+	report = OptimizationReport(rules_before=sum(len(rules) for rules in expanded.values()))
+
+	# Ristiriitaiset säännöt
+	rules: ExpandedGrammar[OutputT] = {}
+	for name, old_rules in expanded.items():
+		rules[name] = [rule for rule in old_rules if not _is_contradictory(rule)]
+		report.contradictory_rules += len(old_rules) - len(rules[name])
+
+	# Tuottamattomat välikkeet
+	productive: set[str] = set()
+	changed = True
+	while changed:
+		changed = False
+		for name, name_rules in rules.items():
+			if name not in productive and any(_is_productive(rule, productive) for rule in name_rules):
+				productive.add(name)
+				changed = True
+
+	report.unproductive_nonterminals = sorted(set(rules) - productive)
+	rules = {
+		name: [rule for rule in name_rules if _is_productive(rule, productive)]
+		for name, name_rules in rules.items()
+		if name in productive or name in roots
+	}
+
+	# Yksinkertaisten yksipaikkaisten sääntöjen ketjut
+	nullable = {name for name, name_rules in rules.items() if any(_allows_empty(rule) for rule in name_rules)}
+	aliases: dict[str, str] = {}
+	for name, name_rules in rules.items():
+		if name not in roots and len(name_rules) == 1 and (target := _identity_target(name_rules[0])) is not None and target != name and target not in nullable:
+			aliases[name] = target
+
+	for name in list(aliases):
+		target = aliases[name]
+		seen = {name}
+		while target in aliases and target not in seen:
+			seen.add(target)
+			target = aliases[target]
+
+		if target in seen:
+			# Kehä, jota ei voi purkaa
+			del aliases[name]
+
+		else:
+			aliases[name] = target
+
+	report.folded_nonterminals = aliases
+	rules = {
+		name: [_rename_nonterminals(rule, aliases) for rule in name_rules]
+		for name, name_rules in rules.items()
+		if name not in aliases
+	}
+
+	# Saavuttamattomat välikkeet
+	reachable = roots & rules.keys()
+	queue = list(reachable)
+	while queue:
+		for rule in rules[queue.pop()]:
+			if isinstance(rule, grammar.ProductionRule):
+				for word in rule.words:
+					if isinstance(word, grammar.Nonterminal) and word.name not in reachable:
+						reachable.add(word.name)
+						queue.append(word.name)
+
+	report.unreachable_nonterminals = sorted(rules.keys() - reachable)
+	rules = {name: name_rules for name, name_rules in rules.items() if name in reachable}
+
+	report.rules_after = sum(len(rules) for rules in rules.values())
+	return rules, report
+
+
+def _is_contradictory(rule: grammar.BaseRule) -> bool:
+	if not isinstance(rule, grammar.ProductionRule) or len(rule.words) != 1:
+		return False
+
+	word = rule.words[0]
+	return isinstance(word, grammar.BaseformTerminal) and word.baseform == "<FALSE>" and set(word.bits) == {"!"}
+
+
+def _is_productive(rule: grammar.BaseRule, productive: set[str]) -> bool:
+	if not isinstance(rule, grammar.ProductionRule):
+		return True
+
+	return all(word.name in productive for word in rule.words if isinstance(word, grammar.Nonterminal))
+
+
+def _allows_empty(rule: grammar.BaseRule) -> bool:
+	return not isinstance(rule, grammar.ProductionRule) and rule.allows_empty_content()
+
+
+def _identity_target(rule: grammar.BaseRule) -> str | None:
+	if isinstance(rule, grammar.ProductionRule) and len(rule.words) == 1 and isinstance(rule.words[0], grammar.Nonterminal) and rule.output.is_identity():
+		return rule.words[0].name
+
+	return None
+
+
+def _rename_nonterminals[OutputT](rule: grammar.BaseRule[OutputT], aliases: dict[str, str]) -> grammar.BaseRule[OutputT]:
+	if not isinstance(rule, grammar.ProductionRule) or not any(isinstance(word, grammar.Nonterminal) and word.name in aliases for word in rule.words):
+		return rule
+
+	words = [
+		grammar.Nonterminal(aliases[word.name], word.bits, word.unexpanded) if isinstance(word, grammar.Nonterminal) and word.name in aliases else word
+		for word in rule.words
+	]
+	return grammar.ProductionRule(rule.nonterminal_name, words, rule.output, origin=rule.origin)
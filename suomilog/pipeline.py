@@ -0,0 +1,190 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+from . import grammar
+from .cykparser import CYKAnalysis, CYKParser
+
+
+type Tokenizer = Callable[[str], list[grammar.Token]]
+
+
+class PipelineResult[OutputT](NamedTuple):
+	line: str
+	tokens: list[grammar.Token]
+	outputs: frozenset[OutputT] | None
+	"""
+	The outputs of the root rule, as returned by `CYKAnalysis.get_output`.
+	"""
+
+
+class ParsePipeline[OutputT]:
+	"""
+	Connects tokenization, parsing and output extraction for a stream of input lines.
+
+	By default the stages are run one line at a time in the calling thread.
+	With `threads=True` each stage runs in its own thread and the stages are connected with queues of at most `queue_size` items.
+	With `processes=n` whole lines are processed in a pool of `n` worker processes, with at most `queue_size` lines in flight.
+	In this case the parser and the tokenizer must be picklable.
+	The workers do not inherit the global state of this process, except for `finnish.DICTIONARY` and the lexicons loaded in `suomilog.finnish`,
+	which are copied to them if the module has been imported.
+
+	In all modes the results are yielded in the order of the input lines.
+	"""
+
+	def __init__(self, parser: CYKParser[OutputT], rule_name: str = ".ROOT{}", tokenizer: Tokenizer | None = None, queue_size: int = 16, threads: bool = False, processes: int = 0):
+		if tokenizer is None:
+			from .finnish import tokenize
+			tokenizer = tokenize
+
+		self.parser = parser
+		self.rule_name = rule_name
+		self.tokenizer = tokenizer
+		self.queue_size = queue_size
+		self.threads = threads
+		self.processes = processes
+
+	def run(self, lines: Iterable[str]) -> Iterator[PipelineResult[OutputT]]:
+		lines = (line.rstrip("\n") for line in lines)
+		if self.processes:
+			return self._run_processes(lines)
+
+		elif self.threads:
+			return self._run_threads(lines)
+
+		else:
+			return (_process_line(self.parser, self.rule_name, self.tokenizer, line) for line in lines)
+
+	def _tokenize(self, line: str) -> tuple[str, list[grammar.Token]]:
+		return line, self.tokenizer(line)
+
+	def _parse(self, item: tuple[str, list[grammar.Token]]) -> tuple[str, CYKAnalysis[OutputT]]:
+		line, tokens = item
+		return line, self.parser.parse(tokens)
+
+	def _extract(self, item: tuple[str, CYKAnalysis[OutputT]]) -> PipelineResult[OutputT]:
+		line, analysis = item
+		return PipelineResult(line, analysis.tokens, analysis.get_output(self.rule_name))
+
+	def _run_threads(self, lines: Iterator[str]) -> Iterator[PipelineResult[OutputT]]:
+		stop = threading.Event()
+		source: Iterator[Any] = lines
+		stages: list[threading.Thread] = []
+		for function in (self._tokenize, self._parse, self._extract):
+			output_queue: queue.Queue = queue.Queue(self.queue_size)
+			thread = threading.Thread(target=_run_stage, args=(function, source, output_queue, stop), daemon=True)
+			thread.start()
+			stages.append(thread)
+			source = _drain(output_queue, stop)
+
+		try:
+			yield from source
+
+		finally:
+			stop.set()
+			for thread in stages:
+				thread.join()
+
+	def _run_processes(self, lines: Iterator[str]) -> Iterator[PipelineResult[OutputT]]:
+		# Suomen kielen työkalujen asetukset siirretään työprosesseihin, jos moduulia käytetään
+		finnish = sys.modules.get(f"{__package__}.finnish")
+		finnish_state = finnish._worker_state() if finnish is not None else None
+		with ProcessPoolExecutor(self.processes, initializer=_init_worker, initargs=(self.parser, self.rule_name, self.tokenizer, finnish_state)) as executor:
+			in_flight: deque[Future[PipelineResult[OutputT]]] = deque()
+			try:
+				for line in lines:
+					in_flight.append(executor.submit(_process_line_in_worker, line))
+					if len(in_flight) >= self.queue_size:
+						yield in_flight.popleft().result()
+
+				while in_flight:
+					yield in_flight.popleft().result()
+
+			finally:
+				for future in in_flight:
+					future.cancel()
+
+
+def _process_line[OutputT](parser: CYKParser[OutputT], rule_name: str, tokenizer: Tokenizer, line: str) -> PipelineResult[OutputT]:
+	tokens = tokenizer(line)
+	return PipelineResult(line, tokens, parser.parse(tokens).get_output(rule_name))
+
+
+class _StageEnd(NamedTuple):
+	error: BaseException | None
+
+
+def _run_stage(function: Callable[[Any], Any], source: Iterator[Any], output_queue: queue.Queue, stop: threading.Event):
+	def put(item):
+		# Ei jäädä jumiin täyteen jonoon, jos kuluttaja on lopettanut
+		while not stop.is_set():
+			try:
+				output_queue.put(item, timeout=0.1)
+				return True
+
+			except queue.Full:
+				continue
+
+		return False
+
+	try:
+		for item in source:
+			if not put(function(item)):
+				return
+
+	except BaseException as e:
+		put(_StageEnd(e))
+
+	else:
+		put(_StageEnd(None))
+
+
+def _drain(input_queue: queue.Queue, stop: threading.Event) -> Iterator[Any]:
+	while not stop.is_set():
+		try:
+			item = input_queue.get(timeout=0.1)
+
+		except queue.Empty:
+			continue
+
+		if isinstance(item, _StageEnd):
+			if item.error is not None:
+				raise item.error
+
+			return
+
+		yield item
+
+
+_worker_state: tuple[CYKParser, str, Tokenizer] | None = None
+
+
+def _init_worker(parser: CYKParser, rule_name: str, tokenizer: Tokenizer, finnish_state: Any):
+	global _worker_state
+	_worker_state = (parser, rule_name, tokenizer)
+	if finnish_state is not None:
+		from . import finnish
+		finnish._init_worker(finnish_state)
+
+
+def _process_line_in_worker(line: str) -> PipelineResult:
+	assert _worker_state is not None
+	return _process_line(*_worker_state, line)
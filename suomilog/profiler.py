@@ -0,0 +1,166 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import copy
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+from . import grammar
+from .cykparser import CYKAnalysis, CYKParser, DenormalizeEndOutput, NormalizedOutput, right_children
+
+
+# A rule of the original grammar, or the name of a custom rule
+type RuleKey = grammar.ProductionRule | str
+
+
+@dataclass
+class RuleCost:
+	rule: RuleKey
+	chart_items: int = 0
+	"""
+	The number of chart items (symbol in a cell) this rule derived.
+	"""
+
+	derivations: int = 0
+	"""
+	The number of ways (splits and child symbols) this rule derived its chart items.
+	Many derivations per chart item means that the rule is ambiguous.
+	"""
+
+	evaluations: int = 0
+	evaluation_time: float = 0.0
+
+	def rule_code(self) -> str:
+		if isinstance(self.rule, str):
+			return self.rule + " ::= <custom rule>"
+
+		return "." + self.rule.nonterminal_name + " ::= " + self.rule.to_code()
+
+
+class GrammarProfiler[OutputT]:
+	"""
+	Attributes parsing cost over a corpus back to the rules of the original grammar.
+
+	The expanded nonterminal names (`.NP{+gen,+sg}`) and the helper symbols of binarized rules (`_CONT`)
+	are mapped back to the `ProductionRule` they were compiled from.
+	"""
+
+	def __init__(self, parser: CYKParser[OutputT], rule_name: str = ".ROOT{}"):
+		self.rule_name = rule_name
+		self.costs: dict[RuleKey, RuleCost] = {}
+		self.inputs = 0
+
+		# Jäsennin kopioidaan, jotta ulostulot voidaan korvata ajastetuilla versioilla muuttamatta alkuperäistä
+		self.parser = copy.copy(parser)
+		self.parser.outputs = {}
+		for key, outputs in parser.outputs.items():
+			origins = parser.output_origins.get(key, [])
+			self.parser.outputs[key] = [self._wrap_output(output, origin) for output, origin in zip(outputs, origins)]
+
+	def _cost(self, rule: RuleKey) -> RuleCost:
+		if rule not in self.costs:
+			self.costs[rule] = RuleCost(rule)
+
+		return self.costs[rule]
+
+	def _wrap_output(self, output: NormalizedOutput[OutputT], origin: grammar.ProductionRule) -> NormalizedOutput[OutputT]:
+		if isinstance(output, grammar.Output):
+			return _ProfiledOutput(output, self._cost(origin))
+
+		elif isinstance(output, DenormalizeEndOutput):
+			return DenormalizeEndOutput(output.a_is_nonterminal, _ProfiledOutput(output.output, self._cost(origin)))
+
+		else:
+			return output
+
+	def profile(self, tokens: list[grammar.Token]) -> CYKAnalysis[OutputT]:
+		"""
+		Parses the tokens, extracts the outputs of the root rule and adds the costs to the report.
+		"""
+		analysis = self.parser.parse(tokens)
+		analysis.get_output(self.rule_name)
+		self._attribute_chart(analysis)
+		self.inputs += 1
+		return analysis
+
+	def profile_corpus(self, corpus: Iterable[list[grammar.Token]]):
+		for tokens in corpus:
+			self.profile(tokens)
+
+	def _attribute_chart(self, analysis: CYKAnalysis[OutputT]):
+		parser = self.parser
+		for (start, end), cell in list(analysis.cyk_table.items()):
+			for symbol in cell:
+				derived_by: defaultdict[RuleKey, int] = defaultdict(int)
+				if symbol in parser.custom_rules and (start, end, symbol) in analysis.token_outputs:
+					derived_by[symbol] += 1
+
+				for child in cell:
+					for origin in parser.output_origins.get((symbol, child), []):
+						derived_by[origin] += 1
+
+				for split in analysis.split_table.get((start, end, symbol), ()):
+					right_cell = right_children(analysis.cyk_table, split, end, analysis.constituents)
+					for left in analysis.cyk_table.get((start, split), ()):
+						for right in right_cell:
+							for origin in parser.output_origins.get((symbol, (left, right)), []):
+								derived_by[origin] += 1
+
+				for zero_rule, right in parser.two_rules_zero_left.get(symbol, ()):
+					if right in cell:
+						for origin in parser.output_origins.get((symbol, (zero_rule, right)), []):
+							derived_by[origin] += 1
+
+				for left, zero_rule in parser.two_rules_zero_right.get(symbol, ()):
+					if left in cell:
+						for origin in parser.output_origins.get((symbol, (left, zero_rule)), []):
+							derived_by[origin] += 1
+
+				for rule, n in derived_by.items():
+					cost = self._cost(rule)
+					cost.chart_items += 1
+					cost.derivations += n
+
+	def report(self, top: int | None = 20, key: str = "derivations") -> list[RuleCost]:
+		"""
+		Returns the most expensive rules, sorted by the given `RuleCost` field.
+		"""
+		costs = sorted(self.costs.values(), key=lambda cost: getattr(cost, key), reverse=True)
+		return costs[:top] if top is not None else costs
+
+	def print(self, top: int | None = 20, key: str = "derivations"):
+		print(f"{'items':>8} {'derivs':>8} {'evals':>8} {'eval ms':>9}  rule  ({self.inputs} inputs)")
+		for cost in self.report(top, key):
+			print(f"{cost.chart_items:>8} {cost.derivations:>8} {cost.evaluations:>8} {cost.evaluation_time*1000:>9.2f}  {cost.rule_code()}")
+
+
+class _ProfiledOutput[OutputT](grammar.Output[OutputT]):
+	def __init__(self, output: grammar.Output[OutputT], cost: RuleCost):
+		self.output = output
+		self.cost = cost
+
+	def __repr__(self):
+		return "_ProfiledOutput(" + repr(self.output) + ")"
+
+	def eval(self, args: Sequence[OutputT]) -> OutputT:
+		start = time.perf_counter()
+		try:
+			return self.output.eval(args)
+
+		finally:
+			self.cost.evaluation_time += time.perf_counter() - start
+			self.cost.evaluations += 1
@@ -0,0 +1,90 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The container format of the memory-mapped files of suomilog (compiled grammars and lexicons).
+
+A file begins with a header (magic, version, byte order check, kind and the number of sections)
+and an (offset, length) entry for each section. The sections follow, each aligned to eight bytes
+so that they can be viewed as arrays of 32-bit or 64-bit integers directly in the mapped file.
+"""
+
+import mmap
+import struct
+from typing import Literal, Mapping, Sequence
+
+
+HEADER = struct.Struct("=8sii4si")
+SECTION = struct.Struct("=qq")
+BYTE_ORDER_CHECK = 0x01020304
+
+
+def write_section_file(path: str, magic: bytes, version: int, kind: bytes, sections: Sequence[bytes]):
+	with open(path, "wb") as file:
+		offset = HEADER.size + SECTION.size * len(sections)
+		entries = []
+		for section in sections:
+			offset += -offset % 8  # Tasataan osiot kahdeksan tavun rajalle
+			entries.append((offset, len(section)))
+			offset += len(section)
+
+		file.write(HEADER.pack(magic, version, BYTE_ORDER_CHECK, kind, len(sections)))
+		for entry in entries:
+			file.write(SECTION.pack(*entry))
+
+		for (offset, _), section in zip(entries, sections):
+			file.write(b"\0" * (offset - file.tell()))
+			file.write(section)
+
+
+class SectionFile:
+	"""
+	A read-only mapping of a file written by `write_section_file`.
+
+	The sections are available as memoryviews in `_sections`. The sections listed in `formats` are cast to that item format.
+	"""
+
+	def __init__(self, path: str, magic: bytes, version: int, kind: bytes, section_count: int, description: str, formats: Mapping[int, Literal["i", "q"]] | None = None):
+		self.path = path
+		with open(path, "rb") as file:
+			self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		file_magic, file_version, byte_order, file_kind, file_section_count = HEADER.unpack_from(self._mmap, 0)
+		if file_magic != magic or file_version != version or file_kind != kind or file_section_count != section_count:
+			self._mmap.close()
+			raise ValueError(f"{path} is not a {description} of version {version}")
+
+		if byte_order != BYTE_ORDER_CHECK:
+			self._mmap.close()
+			raise ValueError(f"{path} was written on a machine with a different byte order")
+
+		self._view = memoryview(self._mmap)
+		self._sections: list[memoryview] = []
+		for i in range(section_count):
+			offset, length = SECTION.unpack_from(self._mmap, HEADER.size + SECTION.size * i)
+			section = self._view[offset:offset+length]
+			self._sections.append(section.cast(formats[i]) if formats is not None and i in formats else section)
+
+	def close(self):
+		self._sections.clear()
+		self._view.release()
+		self._mmap.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
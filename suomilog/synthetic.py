@@ -0,0 +1,202 @@
+# Suomilog
+# Copyright (C) 2026 Iikka Hauhio
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Generators for synthetic grammars and matching inputs, for measuring how the parser scales.
+
+The tokens have hand-made analyses, so pypykko is not needed.
+"""
+
+import itertools
+import math
+import random
+from dataclasses import dataclass
+from typing import AbstractSet, Sequence
+from . import grammar
+
+
+@dataclass(frozen=True)
+class SyntheticGrammarSpec:
+	nonterminals: int = 10
+	rules_per_nonterminal: int = 3
+	"""
+	The number of rules of each nonterminal, including its lexical rule.
+	"""
+
+	max_rule_length: int = 3
+	vocabulary: int = 30
+
+	ambiguity: float = 0.0
+	"""
+	The probability of giving a nonterminal an ambiguous rule `.N ::= .N{$} .N{$}`.
+	"""
+
+	features: int = 1
+	feature_values: int = 2
+	"""
+	Each feature has this many values, and nonterminals are referred to with fixed values or with `$`.
+	The number of expanded nonterminals grows with the number of value combinations.
+	"""
+
+	nullable_density: float = 0.0
+	"""
+	The probability of inserting a nullable nonterminal (a custom rule that matches the empty string) into a rule.
+	"""
+
+	seed: int = 0
+
+
+class EmptyRule(grammar.BaseRule[str]):
+	"""
+	A custom rule that matches only the empty string.
+	"""
+
+	def __repr__(self):
+		return "EmptyRule()"
+
+	def to_code(self) -> str:
+		return "<empty>"
+
+	def match(self, grammar: grammar.Grammar[str], tokens: Sequence[grammar.Token], bits: AbstractSet[str]) -> list[str]:
+		return ["ε"] if not tokens else []
+
+	def expand_bits(self, name: str, grammar: grammar.Grammar[str], bits: AbstractSet[str], extended=None) -> "EmptyRule":
+		return self
+
+	def allows_empty_content(self) -> bool:
+		return True
+
+
+def feature_bits(spec: SyntheticGrammarSpec) -> list[list[str]]:
+	return [[f"+f{i}v{j}" for j in range(spec.feature_values)] for i in range(spec.features)]
+
+
+def generate_grammar(spec: SyntheticGrammarSpec = SyntheticGrammarSpec()) -> grammar.Grammar[str]:
+	"""
+	Generates a grammar with the root nonterminal `ROOT`.
+
+	The root is a list of items (`.S ::= .ITEM{$} .S{$}`), and each item is one of the nonterminals `N0`, `N1`, ...
+	To keep the grammar free of unary cycles, nonterminals only refer to nonterminals with a larger index,
+	except in the ambiguous rules, which are binary.
+	"""
+	rnd = random.Random(spec.seed)
+	features = feature_bits(spec)
+	lines: list[str] = []
+
+	for values in itertools.islice(itertools.product(*features), 4):
+		lines.append(f".ROOT ::= .S{{{','.join(values)}}} -> $1" if values else ".ROOT ::= .S -> $1")
+
+	lines.append(".S ::= .ITEM{$} .S{$} -> $1 $2")
+	lines.append(".S ::= .ITEM{$} -> $1")
+	for i in range(spec.nonterminals):
+		lines.append(f".ITEM ::= .N{i}{{$}} -> $1")
+
+	for i in range(spec.nonterminals):
+		word = rnd.randrange(spec.vocabulary)
+		lines.append(f".N{i} ::= w{word}{{$}} -> w{word}")
+		for _ in range(spec.rules_per_nonterminal - 1):
+			words = []
+			for _ in range(rnd.randint(1, spec.max_rule_length)):
+				if i + 1 < spec.nonterminals and rnd.random() < 0.5:
+					j = rnd.randrange(i + 1, spec.nonterminals)
+					bits = "$" if not features or rnd.random() < 0.5 else ",".join(rnd.choice(values) for values in features)
+					words.append(f".N{j}{{{bits}}}")
+
+				else:
+					words.append(f"w{rnd.randrange(spec.vocabulary)}{{$}}")
+
+				if rnd.random() < spec.nullable_density:
+					words.append(".EMPTY")
+
+			outputs = " ".join(f"${k+1}" for k in range(sum(word.startswith(".") for word in words)))
+			lines.append(f".N{i} ::= {' '.join(words)} -> ({outputs})")
+
+		if rnd.random() < spec.ambiguity:
+			lines.append(f".N{i} ::= .N{i}{{$}} .N{i}{{$}} -> ($1 $2)")
+
+	g: grammar.Grammar[str] = grammar.Grammar()
+	g.loads("\n".join(lines))
+	g.rules["EMPTY"] = [EmptyRule()]
+	return g
+
+
+def generate_tokens(g: grammar.Grammar[str], length: int, seed: int = 0) -> list[grammar.Token]:
+	"""
+	Generates a random input of exactly `length` tokens that is in the language of a grammar made by `generate_grammar`.
+	"""
+	rnd = random.Random(seed)
+	_, expanded = g.expand_bits("ROOT", set())
+	min_lengths = _min_lengths(expanded)
+
+	root_rule = rnd.choice([rule for rule in expanded[".ROOT{}"] if isinstance(rule, grammar.ProductionRule) and _word_min_length(rule.words[0], min_lengths) < math.inf])
+	s_word = root_rule.words[0]
+	assert isinstance(s_word, grammar.Nonterminal)
+	item_name = next(word.name for rule in expanded[s_word.name] if isinstance(rule, grammar.ProductionRule) and len(rule.words) == 1 for word in rule.words if isinstance(word, grammar.Nonterminal))
+
+	tokens: list[grammar.Token] = []
+	while len(tokens) < length:
+		tokens += _sample(expanded, min_lengths, item_name, length - len(tokens), rnd)
+
+	return tokens
+
+
+def _word_min_length(word: grammar.TerminalOrNonterminal, min_lengths: dict[str, float]) -> float:
+	if isinstance(word, grammar.Nonterminal):
+		return min_lengths.get(word.name, math.inf)
+
+	elif isinstance(word, grammar.BaseformTerminal) and word.baseform == "<FALSE>":
+		return math.inf
+
+	return 1
+
+
+def _rule_min_length(rule: grammar.BaseRule[str], min_lengths: dict[str, float]) -> float:
+	if isinstance(rule, grammar.ProductionRule):
+		return sum(_word_min_length(word, min_lengths) for word in rule.words)
+
+	return 0 if rule.allows_empty_content() else 1
+
+
+def _min_lengths(expanded: dict[str, list[grammar.BaseRule[str]]]) -> dict[str, float]:
+	min_lengths: dict[str, float] = {}
+	changed = True
+	while changed:
+		changed = False
+		for name, rules in expanded.items():
+			length = min(_rule_min_length(rule, min_lengths) for rule in rules)
+			if length < min_lengths.get(name, math.inf):
+				min_lengths[name] = length
+				changed = True
+
+	return min_lengths
+
+
+def _sample(expanded: dict[str, list[grammar.BaseRule[str]]], min_lengths: dict[str, float], name: str, budget: int, rnd: random.Random) -> list[grammar.Token]:
+	rule = rnd.choice([rule for rule in expanded[name] if _rule_min_length(rule, min_lengths) <= budget])
+	if not isinstance(rule, grammar.ProductionRule):
+		return []
+
+	tokens: list[grammar.Token] = []
+	for i, word in enumerate(rule.words):
+		rest = sum(_word_min_length(w, min_lengths) for w in rule.words[i+1:])
+		if isinstance(word, grammar.Nonterminal):
+			tokens += _sample(expanded, min_lengths, word.name, int(budget - len(tokens) - rest), rnd)
+
+		else:
+			assert isinstance(word, grammar.BaseformTerminal)
+			tokens.append(grammar.Token(word.baseform, [(word.baseform, {bit for bit in word.bits if not bit.startswith("!")})]))
+
+	return tokens